@@ -0,0 +1,111 @@
+"""
+This module contains an in memory index of the blocks saved by the client,
+so finding blocks doesn't require scanning the data directory.
+"""
+import os
+
+from utils import parse_file_name
+
+
+class BlockIndex(object):
+    """
+    Index of the saved blocks.
+
+    The blocks are indexed by their name, and then by their number and type.
+    The directory is scanned once, when the index is created, and the
+    index is updated on every block that is saved or deleted.
+
+    Attributes:
+        data_path (str): The path of the saved blocks.
+    """
+
+    def __init__(self, data_path):
+        """
+        Initialize the index from the saved blocks.
+
+        Args:
+            data_path (str): The path of the saved blocks.
+        """
+        self.data_path = data_path
+        self.__blocks = {}
+
+        # the names are parsed directly from the listing, names which
+        # are hidden or not in the block name format are skipped
+        for file_name in os.listdir(unicode(data_path)):
+            if file_name.startswith('.'):
+                continue
+
+            try:
+                name, number, block_type = parse_file_name(file_name)
+            except ValueError:
+                continue
+
+            path = os.path.join(data_path, file_name)
+            self.add(name, number, block_type, path)
+
+    def add(self, name, number, block_type, path):
+        """
+        Add a block to the index.
+
+        Args:
+            name (str): The file name.
+            number (str): The block number.
+            block_type (str): The block type.
+            path (str): The path of the block.
+        """
+        blocks = self.__blocks.setdefault(name, {})
+        blocks[(str(number), block_type)] = path
+
+    def remove(self, name, number, block_type):
+        """
+        Remove a block from the index.
+
+        Args:
+            name (str): The file name.
+            number (str): The block number.
+            block_type (str): The block type.
+        """
+        blocks = self.__blocks.get(name, {})
+        blocks.pop((str(number), block_type), None)
+
+        if not blocks:
+            self.__blocks.pop(name, None)
+
+    def find(self, name='*', number='*', block_type='*'):
+        """
+        Return the blocks matching the given details.
+
+        Every detail can be '*', which matches any value.
+
+        Args:
+            name (str, optional): The file name.
+            number (str, optional): The block number.
+            block_type (str, optional): The block type.
+
+        Returns:
+            list of tuple: List of the details of the blocks
+                (as a tuple, like parse_file_name) and their paths.
+        """
+        if name == '*':
+            names = self.__blocks.keys()
+        elif name in self.__blocks:
+            names = [name]
+        else:
+            names = []
+
+        number = str(number)
+        result = []
+
+        for block_name in names:
+            for key, path in self.__blocks[block_name].iteritems():
+                block_number, block_block_type = key
+
+                if number not in ('*', block_number):
+                    continue
+                if block_type not in ('*', block_block_type):
+                    continue
+
+                block_info = (block_name, block_number, block_block_type)
+                result.append((block_info, path))
+
+        return result
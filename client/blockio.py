@@ -0,0 +1,297 @@
+"""
+This module batches disk operations on blocks.
+
+An operation on many blocks is submitted at once to a pool of worker
+threads, so the waits of the system calls overlap, instead of waiting
+for every block in turn. Written blocks are kept in memory and written
+to the disk together in the background.
+"""
+from multiprocessing.pool import ThreadPool
+import errno
+import logging
+import os
+import threading
+import time
+
+from utils import handle_except
+
+# batches smaller than this are executed by the calling thread
+BATCH_THRESHOLD = 8
+
+# the maximal size in bytes of the blocks waiting to be written
+WRITE_BACK_SIZE = 16 * 1024 * 1024
+
+# seconds to wait for more blocks before writing them to the disk
+WRITE_BACK_INTERVAL = 0.05
+
+
+def _size(path):
+    """
+    Return the size of a block file.
+
+    Args:
+        path (str): The path of the block.
+
+    Returns:
+        int: The size of the block, or None if it can't be accessed.
+    """
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return None
+
+
+def _remove(path):
+    """
+    Remove a block file.
+
+    Args:
+        path (str): The path of the block.
+
+    Returns:
+        bool: True if the block doesn't exist anymore, else False.
+    """
+    try:
+        os.remove(path)
+    except OSError as e:
+        return e.errno == errno.ENOENT
+    return True
+
+
+class BlockIOEngine(object):
+    """
+    Execute disk operations on batches of blocks.
+
+    Attributes:
+        workers (int): The number of worker threads.
+    """
+
+    def __init__(self, workers=4):
+        """
+        Initialize the engine.
+
+        The worker threads are created only when the first batch
+        which is big enough is submitted.
+
+        Args:
+            workers (int, optional): The number of worker threads.
+        """
+        self.workers = workers
+        self.__pool = None
+
+    def __map(self, function, paths):
+        """
+        Apply a function on every path of a batch.
+
+        Args:
+            function (function): The operation on a single path.
+            paths (list of str): The paths of the blocks.
+
+        Returns:
+            list: The results, in the order of the paths.
+        """
+        if len(paths) < BATCH_THRESHOLD:
+            return map(function, paths)
+
+        if self.__pool is None:
+            self.__pool = ThreadPool(self.workers)
+        return self.__pool.map(function, paths)
+
+    def sizes(self, paths):
+        """
+        Return the sizes of blocks.
+
+        Args:
+            paths (list of str): The paths of the blocks.
+
+        Returns:
+            list of int: The sizes of the blocks, None for every
+                block that can't be accessed.
+        """
+        return self.__map(_size, paths)
+
+    def remove(self, paths):
+        """
+        Remove blocks.
+
+        Args:
+            paths (list of str): The paths of the blocks.
+
+        Returns:
+            list of bool: For every block, True if it doesn't exist anymore.
+        """
+        return self.__map(_remove, paths)
+
+    def close(self):
+        """Stop the worker threads."""
+        if self.__pool is not None:
+            self.__pool.close()
+            self.__pool = None
+
+
+class WriteBackThread(threading.Thread):
+    """
+    Write blocks to the disk in the background.
+
+    The written blocks are kept in memory, and are written to the disk
+    together shortly after, so a burst of small blocks doesn't wait for
+    the disk on every block. When the pending blocks exceed the maximal
+    size, they are written immediately by the writing thread.
+
+    The blocks which couldn't be written are collected, so the caller
+    can stop treating them as saved.
+
+    Attributes:
+        interval (float): Seconds to wait for more blocks before writing.
+        logger (logging.Logger): The logger of the thread.
+        max_size (int): The maximal size in bytes of the pending blocks.
+        running (bool): The flag of the main loop.
+    """
+
+    def __init__(self, max_size=WRITE_BACK_SIZE,
+                 interval=WRITE_BACK_INTERVAL):
+        """
+        Initialize the write back thread.
+
+        Args:
+            max_size (int, optional): The maximal size in bytes
+                of the pending blocks.
+            interval (float, optional): Seconds to wait for more blocks
+                before writing.
+        """
+        current_class = self.__class__
+        thread_name = current_class.__name__
+        super(current_class, self).__init__(name=thread_name)
+        self.daemon = True
+        self.logger = logging.getLogger('logic')
+
+        self.max_size = max_size
+        self.interval = interval
+
+        # blocks waiting to be written, and blocks being written
+        self.__pending = {}
+        self.__pending_size = 0
+        self.__flushing = {}
+        self.__failed = []
+
+        # the lock protects the dicts, the flush lock is held while
+        # blocks are written, so they can't be discarded in the middle
+        self.__lock = threading.Lock()
+        self.__flush_lock = threading.Lock()
+        self.__dirty = threading.Event()
+
+        self.running = True
+
+    def write(self, path, content):
+        """
+        Write a block.
+
+        Args:
+            path (str): The path of the block.
+            content (str): The content of the block.
+        """
+        with self.__lock:
+            old = self.__pending.get(path)
+            if old is not None:
+                self.__pending_size -= len(old)
+
+            self.__pending[path] = content
+            self.__pending_size += len(content)
+            full = self.__pending_size >= self.max_size
+
+        if full:
+            self.flush()
+        else:
+            self.__dirty.set()
+
+    def get(self, path):
+        """
+        Return the content of a block that is not written to the disk yet.
+
+        Args:
+            path (str): The path of the block.
+
+        Returns:
+            str: The content of the block, or None if it is on the disk.
+        """
+        with self.__lock:
+            content = self.__pending.get(path)
+            if content is None:
+                content = self.__flushing.get(path)
+        return content
+
+    def discard(self, path):
+        """
+        Cancel the writing of a block.
+
+        Args:
+            path (str): The path of the block.
+        """
+        with self.__flush_lock:
+            with self.__lock:
+                content = self.__pending.pop(path, None)
+                if content is not None:
+                    self.__pending_size -= len(content)
+
+    def failed(self):
+        """
+        Return the blocks which couldn't be written since the last call.
+
+        Returns:
+            list of str: The paths of the blocks.
+        """
+        with self.__lock:
+            failed = self.__failed
+            self.__failed = []
+        return failed
+
+    def flush(self):
+        """
+        Write all the pending blocks to the disk.
+
+        The blocks are synced to the disk before they are dropped from
+        memory, so a written block survives a crash of the client.
+        """
+        with self.__flush_lock:
+            with self.__lock:
+                self.__flushing = self.__pending
+                self.__pending = {}
+                self.__pending_size = 0
+                self.__dirty.clear()
+
+            failed = []
+            for path, content in self.__flushing.iteritems():
+                try:
+                    with open(path, 'wb') as f:
+                        f.write(content)
+                        f.flush()
+                        os.fsync(f.fileno())
+                except:
+                    self.logger.exception(
+                        'an error acurred while trying to write to file:\n')
+                    _remove(path)
+                    failed.append(path)
+
+            with self.__lock:
+                self.__flushing = {}
+
+                # a block which was written again meanwhile is still pending
+                self.__failed.extend(
+                    path for path in failed if path not in self.__pending)
+
+    def close(self):
+        """Stop the thread and write all the pending blocks."""
+        self.running = False
+        self.__dirty.set()
+        self.join()
+        self.flush()
+
+    @handle_except('logic')
+    def run(self):
+        """Execute the write back thread."""
+        while self.running:
+            self.__dirty.wait()
+
+            # wait for more blocks, to write them together
+            time.sleep(self.interval)
+            self.flush()
@@ -7,6 +7,9 @@ import os
 
 __root = os.path.abspath(os.sep)
 
+# the size of the disk doesn't change, so it is read only once
+__total = None
+
 
 # unix
 if hasattr(os, 'statvfs'):
@@ -18,9 +21,11 @@ if hasattr(os, 'statvfs'):
         Returns:
             (long): The size of the disk in bytes.
         """
-        st = os.statvfs(__root)
-        total = st.f_blocks * st.f_frsize
-        return total
+        global __total
+        if __total is None:
+            st = os.statvfs(__root)
+            __total = st.f_blocks * st.f_frsize
+        return __total
 
     def free():
         """
@@ -32,6 +37,18 @@ if hasattr(os, 'statvfs'):
         st = os.statvfs(__root)
         return st.f_bavail * st.f_frsize
 
+    def state():
+        """
+        Return the total size and the free space of the disk in bytes.
+
+        Returns:
+            (tuple): The size and the free space of the disk in bytes.
+        """
+        global __total
+        st = os.statvfs(__root)
+        __total = st.f_blocks * st.f_frsize
+        return __total, st.f_bavail * st.f_frsize
+
 
 # windows
 elif os.name == 'nt':
@@ -50,16 +67,19 @@ elif os.name == 'nt':
         Returns:
             (long): The size of the disk in bytes.
         """
-        _, _ = ctypes.c_ulonglong(), ctypes.c_ulonglong()
-        total = ctypes.c_ulonglong()
+        global __total
+        if __total is None:
+            _, _ = ctypes.c_ulonglong(), ctypes.c_ulonglong()
+            total = ctypes.c_ulonglong()
 
-        code = win_function(
-            __root, ctypes.byref(_), ctypes.byref(total), ctypes.byref(_))
+            code = win_function(
+                __root, ctypes.byref(_), ctypes.byref(total), ctypes.byref(_))
 
-        if code == 0:
-            raise ctypes.WinError()
+            if code == 0:
+                raise ctypes.WinError()
 
-        return total.value
+            __total = total.value
+        return __total
 
     def free():
         """
@@ -79,6 +99,26 @@ elif os.name == 'nt':
 
         return free.value
 
+    def state():
+        """
+        Return the total size and the free space of the disk in bytes.
+
+        Returns:
+            (tuple): The size and the free space of the disk in bytes.
+        """
+        global __total
+        _ = ctypes.c_ulonglong()
+        total, free = ctypes.c_ulonglong(), ctypes.c_ulonglong()
+
+        code = win_function(
+            __root, ctypes.byref(_), ctypes.byref(total), ctypes.byref(free))
+
+        if code == 0:
+            raise ctypes.WinError()
+
+        __total = total.value
+        return __total, free.value
+
 # platform not supported
 else:
     raise NotImplementedError('unknown platform')
@@ -1,4 +1,3 @@
-import threading
 import logging
 import logging.config
 import os
@@ -10,139 +9,233 @@ import protocol
 import protocol.client
 import protocol.thread
 import diskutil
-from utils import handle_except, build_file_name, glob
-from utils import parse_file_name
+import blockio
+import blockindex
+from utils import handle_except, build_file_name, parse_file_name
 
 
-class LogicThread(threading.Thread):
+class Logic(object):
     """
-    Summary
+    Handles the messages received from the server.
+
+    The receiver thread calls handle directly for every message,
+    so a message doesn't wait for another thread to wake up.
 
     Attributes:
+        block_io (blockio.BlockIOEngine): Executes operations on the blocks.
+        blocks (blockindex.BlockIndex): The index of the saved blocks.
+        command_dict (dict): Dispatch a message type to a handler.
         data_path (str): The path of the saved blocks.
-        logger (logging.Logger): The logger of the thread.
-        logic_queue (Queue.Queue): The queue of the thread.
-        network_queue (Queue.Queue): The queue of the reciever thread.
-        running (bool): The flag of the main loop.
+        logger (logging.Logger): The logger of the logic.
+        network_queue (ring.MPSCRing): The queue of the reciever thread.
+        running (bool): False after a kill message was handled.
+        write_back (blockio.WriteBackThread): Writes the blocks to the disk.
     """
 
-    def __init__(self, data_path, logic_queue, network_queue):
+    def __init__(self, data_path, network_queue):
         """
-        Initialize the logic thread.
+        Initialize the logic.
 
         Args:
             data_path (str): The path of the saved blocks.
-            logic_queue (Queue.Queue): The queue of the thread.
-            network_queue (Queue.Queue): The queue of the reciever thread.
+            network_queue (ring.MPSCRing): The queue of the reciever thread.
         """
-        current_class = self.__class__
-        thread_name = current_class.__name__
-        super(current_class, self).__init__(name=thread_name)
         self.logger = logging.getLogger('logic')
 
         self.data_path = data_path
-        self.logic_queue = logic_queue
         self.network_queue = network_queue
 
+        self.block_io = blockio.BlockIOEngine()
+        self.blocks = blockindex.BlockIndex(data_path)
+        self.write_back = blockio.WriteBackThread()
+        self.write_back.start()
         self.running = True
 
+        # the dict dispatch a message type to a handler
+        self.command_dict = {
+            'send_block': self.send_block,
+            'ask_block': self.ask_block,
+            'delete_block': self.delete_block,
+            'ask_disk_state': self.ask_disk_state,
+            'ask_storage_state': self.ask_storage_state,
+            'kill': self.kill
+        }
+
+    def send_block(self, message):
+        """
+        Store a block.
+
+        Args:
+            message (dict): The send_block message.
+        """
+        file_name = build_file_name(
+            name=message['name'],
+            number=message['number'],
+            block_type=message['block_type'])
+
+        file_path = os.path.join(self.data_path, file_name)
+
+        content = message['content']
+
+        self.write_back.write(file_path, content)
+        self.blocks.add(
+            name=message['name'],
+            number=message['number'],
+            block_type=message['block_type'],
+            path=file_path)
+
+    def ask_block(self, message):
+        """
+        Send blocks to the server.
+
+        Args:
+            message (dict): The ask_block message.
+        """
+        block_list = self.blocks.find(
+            name=message['name'],
+            number=message['number'],
+            block_type=message['block_type'])
+
+        # blocks which are not written to the disk yet are sent from memory
+        stored_list = []
+        for block_info, block in block_list:
+            content = self.write_back.get(block)
+
+            if content is None:
+                stored_list.append((block_info, block))
+            else:
+                block_name, number, block_type = block_info
+                net_message = protocol.client.block(
+                    block_type=block_type,
+                    name=block_name,
+                    number=number,
+                    content=content)
+
+                thread_message = protocol.thread.send(message=net_message)
+                self.network_queue.put(thread_message)
+
+        # the content of the blocks is streamed from the files
+        # by the sender thread, only the headers are built here
+        paths = [block for _, block in stored_list]
+        sizes = self.block_io.sizes(paths)
+
+        for (block_info, block), size in zip(stored_list, sizes):
+            if size is None:
+                self.logger.error(
+                    'an error acurred while reading file: %s' % block)
+            else:
+                block_name, number, block_type = block_info
+                net_message = protocol.client.block_header(
+                    block_type=block_type,
+                    name=block_name,
+                    number=number,
+                    size=size)
+
+                thread_message = protocol.thread.send(
+                    message=net_message, file_path=block)
+                self.network_queue.put(thread_message)
+
+        # announce the server that all block were sent
+        name = message['name']
+        net_message_finished = protocol.client.file_sent(name)
+        thread_message_finished = protocol.thread.send(
+            message=net_message_finished)
+        self.network_queue.put(thread_message_finished)
+
+    def delete_block(self, message):
+        """
+        Delete blocks.
+
+        Args:
+            message (dict): The delete_block message.
+        """
+        block_list = self.blocks.find(
+            name=message['name'],
+            number=message['number'],
+            block_type=message['block_type'])
+
+        paths = [block for _, block in block_list]
+        for block in paths:
+            self.write_back.discard(block)
+        removed = self.block_io.remove(paths)
+
+        for (block_info, block), success in zip(block_list, removed):
+            if success:
+                self.blocks.remove(*block_info)
+            else:
+                self.logger.error(
+                    'an error acurred while deleting file: %s' % block)
+
+    def ask_disk_state(self, message):
+        """
+        Send the disk state to the server.
+
+        Args:
+            message (dict): The ask_disk_state message.
+        """
+        total, free = diskutil.state()
+
+        net_message = protocol.client.disk_state(
+            total=total, free=free)
+        message = protocol.thread.send(
+            message=net_message)
+
+        self.network_queue.put(message)
+
+    def ask_storage_state(self, message):
+        """
+        Send the storage state to the server.
+
+        Args:
+            message (dict): The ask_storage_state message.
+        """
+        block_list = [info for info, _ in self.blocks.find()]
+        net_message = protocol.client.storage_state(blocks=block_list)
+        message = protocol.thread.send(
+            message=net_message)
+        self.network_queue.put(message)
+
+    def flush(self):
+        """Write the blocks which are not written yet to the disk."""
+        self.write_back.flush()
+        self.remove_failed()
+
+    def remove_failed(self):
+        """Remove the blocks which couldn't be written from the index."""
+        for path in self.write_back.failed():
+            block_info = parse_file_name(os.path.basename(path))
+            self.blocks.remove(*block_info)
+
+    def kill(self, message):
+        """
+        Stop the logic, and pass the kill message to the sender thread.
+
+        Args:
+            message (dict): The kill message.
+        """
+        self.write_back.close()
+        self.block_io.close()
+        self.network_queue.put(message)
+        self.running = False
+
     @handle_except('logic')
-    def run(self):
-        """Execute the logic thread."""
-        while self.running:
-            message = self.logic_queue.get()
-            message_type = message['type']
-
-            self.logger.info(
-                'received message of type %s' % message_type)
-
-            # store a block
-            if message_type == 'send_block':
-                file_name = build_file_name(
-                    name=message['name'],
-                    number=message['number'],
-                    block_type=message['block_type'])
-
-                file_path = os.path.join(self.data_path, file_name)
-
-                content = message['content']
-
-                try:
-                    with open(file_path, 'wb') as f:
-                        f.write(content)
-                except:
-                    self.logger.exception(
-                        'an error acurred while trying to write to file:\n')
-
-            # send a block to the server
-            elif message_type == 'ask_block':
-                file_name = build_file_name(
-                    name=message['name'],
-                    number=message['number'],
-                    block_type=message['block_type'])
-
-                for block in glob(self.data_path, file_name):
-                    try:
-                        with open(block, 'rb') as f:
-                            content = f.read()
-                    except:
-                        self.logger.exception(
-                            'an error acurred while reading file: %s' % block)
-                    else:
-                        real_file = os.path.basename(block)
-                        block_info = parse_file_name(real_file)
-
-                        net_message = protocol.client.block(
-                            block_type=block_info['block_type'],
-                            name=block_info['name'],
-                            number=block_info['number'],
-                            content=content)
-
-                        thread_message = protocol.thread.send(
-                            message=net_message)
-                        self.network_queue.put(thread_message)
-
-                # announce the server that all block were sent
-                name = message['name']
-                net_message_finished = protocol.client.file_sent(name)
-                thread_message_finished = protocol.thread.send(
-                    message=net_message_finished)
-                self.network_queue.put(thread_message_finished)
-
-            # delete blocks
-            elif message_type == 'delete_block':
-                file_name = file_name = build_file_name(
-                    name=message['name'],
-                    number=message['number'],
-                    block_type=message['block_type'])
-
-                block_list = glob(self.data_path, file_name)
-                for file in block_list:
-                    os.remove(file)
-
-            # send the disk state to the server
-            elif message_type == 'ask_disk_state':
-                total = diskutil.total()
-                free = diskutil.free()
-
-                net_message = protocol.client.disk_state(
-                    total=total, free=free)
-                message = protocol.thread.send(
-                    message=net_message)
-
-                self.network_queue.put(message)
-
-            # send the storage state to the server
-            elif message_type == 'ask_storage_state':
-                block_list = glob(self.data_path, '*_*.*')
-                block_list = map(os.path.basename, block_list)
-                block_list = map(parse_file_name, block_list)
-                net_message = protocol.client.storage_state(blocks=block_list)
-                message = protocol.thread.send(
-                    message=net_message)
-                self.network_queue.put(message)
-
-            # end the thread
-            elif message_type == 'kill':
-                self.network_queue.put(message)
-                self.running = False
\ No newline at end of file
+    def handle(self, message):
+        """
+        Handle a message received from the server.
+
+        Args:
+            message (dict): The message.
+        """
+        message_type = message['type']
+
+        # the index is changed only by the receiver thread
+        self.remove_failed()
+
+        self.logger.info(
+            'received message of type %s' % message_type)
+
+        if message_type in self.command_dict:
+            self.command_dict[message_type](message)
+        else:
+            self.logger.warning(
+                'unknown message type %s, ignoring' % message_type)
\ No newline at end of file
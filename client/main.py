@@ -3,17 +3,34 @@ This module is the main module of the client, and contains
 almost all the necessery classes needed to run it.
 """
 
-import Queue
+import atexit
 import logging
 import optparse
 import json
 import os
+import signal
+import time
 
 import sys
 sys.dont_write_bytecode = True
 
 import network
 import logic
+import ring
+
+# seconds to wait for the sender thread to send the rest of the queue
+SENDER_TIMEOUT = 5
+
+
+def terminate(signum, frame):
+    """
+    Exit on a termination signal, so the exit handlers are executed.
+
+    Args:
+        signum (int): The number of the signal.
+        frame (frame): The frame interrupted by the signal.
+    """
+    sys.exit(0)
 
 
 def main():
@@ -45,26 +62,43 @@ def main():
     if not os.path.exists(options.data_path):
         os.mkdir(options.data_path)
 
-    logic_queue = Queue.Queue()
-    network_queue = Queue.Queue()
+    network_queue = ring.MPSCRing(1024)
+
+    # the received messages are handled by the receiver thread itself
+    client_logic = logic.Logic(
+        data_path=options.data_path,
+        network_queue=network_queue)
 
     network_receiver_thread = network.NetworkReceiverThread(
         server_ip=options.server_ip,
         port=options.port,
         network_queue=network_queue,
-        logic_queue=logic_queue)
+        logic=client_logic)
 
     network_sender_thread = network.NetworkSenderThread(
         network_queue=network_queue)
 
-    logic_thread = logic.LogicThread(
-        data_path=options.data_path,
-        logic_queue=logic_queue,
-        network_queue=network_queue)
+    # the blocks which are not written yet are written on exit
+    atexit.register(client_logic.write_back.flush)
+
+    # the main thread waits for the network threads itself, so it
+    # handles the signals, and the process can exit without them
+    network_receiver_thread.daemon = True
+    network_sender_thread.daemon = True
+    signal.signal(signal.SIGTERM, terminate)
 
     network_receiver_thread.start()
     network_sender_thread.start()
-    logic_thread.start()
+
+    try:
+        while network_receiver_thread.is_alive():
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    else:
+        # the receiver thread exits after a kill message, which was
+        # passed to the sender thread after the rest of the messages
+        network_sender_thread.join(SENDER_TIMEOUT)
 
 if __name__ == '__main__':
     main()
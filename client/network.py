@@ -12,6 +12,32 @@ import protocol.client
 import protocol.thread
 from utils import handle_except
 
+# the size of the parts of a file sent to the server
+FILE_CHUNK_SIZE = 64 * 1024
+
+# the size of the kernel buffers of the socket
+SOCKET_BUFFER_SIZE = 1024 * 1024
+
+# the initial size of the buffer of the received messages
+RECEIVE_BUFFER_SIZE = 64 * 1024
+
+
+def create_socket():
+    """
+    Create a socket for the connection to the server.
+
+    Nagle's algorithm is disabled, so small messages are not delayed,
+    and the kernel buffers are enlarged for the block transfers.
+
+    Returns:
+        socket.socket: The socket.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE)
+    return sock
+
 
 class NetworkReceiverThread(threading.Thread):
     """
@@ -21,23 +47,23 @@ class NetworkReceiverThread(threading.Thread):
         connected (bool): Flag indicating if the client is
             connected to the server.
         logger (logging.Logger): The logger of the thread.
-        logic_queue (Queue.Queue): The queue of the logic thread.
-        network_queue (Queue.Queue): The queue of the network thread.
+        logic (logic.Logic): Handles the received messages.
+        network_queue (ring.MPSCRing): The queue of the network thread.
         port (int): The port of the connection.
         running (bool): The flag of the main loop.
         server_ip (str): The IP address of the server.
         socket (socket.socket): The socket connecte to the server.
     """
 
-    def __init__(self, server_ip, port, network_queue, logic_queue):
+    def __init__(self, server_ip, port, network_queue, logic):
         """
         Initialize the receiver thread.
 
         Args:
             server_ip (str): The IP address of the server.
             port (int): The port of the connection.
-            network_queue (Queue.Queue): The queue of the network thread.
-            logic_queue (Queue.Queue): The queue of the logic thread.
+            network_queue (ring.MPSCRing): The queue of the network thread.
+            logic (logic.Logic): Handles the received messages.
         """
         current_class = self.__class__
         thread_name = current_class.__name__
@@ -47,12 +73,46 @@ class NetworkReceiverThread(threading.Thread):
         self.server_ip = server_ip
         self.port = port
         self.network_queue = network_queue
-        self.logic_queue = logic_queue
+        self.logic = logic
 
-        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket = create_socket()
         self.running = True
         self.connected = False
 
+        # reused by all the received messages, grows to the largest message
+        self.__buffer = bytearray(RECEIVE_BUFFER_SIZE)
+
+    def recv_exact(self, size):
+        """
+        Receive exactly the given number of bytes from the socket.
+
+        The bytes are received directly into a buffer which is
+        reused between calls.
+
+        Args:
+            size (int): The number of bytes to receive.
+
+        Returns:
+            str: The received bytes, or None if the connection was closed.
+        """
+        if len(self.__buffer) < size:
+            self.__buffer = bytearray(size)
+
+        view = memoryview(self.__buffer)[:size]
+        received = 0
+
+        while received < size:
+            try:
+                count = self.socket.recv_into(view[received:])
+            except:
+                count = 0
+
+            if count == 0:
+                return None
+            received += count
+
+        return view.tobytes()
+
     @handle_except('network')
     def run(self):
         """Execute the receiver thread."""
@@ -65,6 +125,11 @@ class NetworkReceiverThread(threading.Thread):
                 except:
                     time.sleep(2)
                 else:
+                    # acknowledge received data immediately (linux only)
+                    if hasattr(socket, 'TCP_QUICKACK'):
+                        self.socket.setsockopt(
+                            socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+
                     self.connected = True
                     message = protocol.thread.new_socket(socket=self.socket)
                     self.network_queue.put(message)
@@ -74,31 +139,16 @@ class NetworkReceiverThread(threading.Thread):
             while self.connected:
 
                 # if receive fail, go back to reconnection
-                try:
-                    size_str = self.socket.recv(4)
-                except:
-                    self.connected = False
+                size_str = self.recv_exact(4)
 
-                if size_str != '':
+                if size_str is not None:
                     size = protocol.get_size(size_str)
-                    received = ''
-
-                    # receive until the whole message is received
-                    while size != 0:
+                    received = self.recv_exact(size)
 
-                        try:
-                            part = self.socket.recv(size)
-                        except:
-                            part = ''
-
-                        # if the connection is close,
-                        # return to waiting to connection
-                        if part == '':
-                            self.connected = False
-                            break
-
-                        received += part
-                        size -= len(part)
+                    # if the connection is close,
+                    # return to waiting to connection
+                    if received is None:
+                        self.connected = False
 
                     # if the messaged was received without failing,
                     # pass it to the logic
@@ -107,12 +157,10 @@ class NetworkReceiverThread(threading.Thread):
                             'received message. length: %s' % len(received))
                         message = protocol.parse(received)
 
-                        self.logic_queue.put(message)
+                        self.logic.handle(message)
 
-                        # if the message type is 'kill', the thread will exit
-                        # this must happen here and not in the logic thread,
-                        # because the logic thread has no way to send a message
-                        # to this thread because it doesn't have a queue.
+                        # if the message type is 'kill', the thread will exit.
+                        # the logic already passed it to the sender thread.
                         if message['type'] == 'kill':
                             self.socket.close()
                             self.connected = False
@@ -121,29 +169,10 @@ class NetworkReceiverThread(threading.Thread):
                 else:
                     self.connected = False
 
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-
-
-def split_string(string, n):
-    """
-    Return a generator of evenly sized part of a string.
-
-    Args:
-        string (str): The string to split.
-        n (int): The size of the parts.
-
-    Returns:
-        generator: Generator of the part.
-    """
-    index = 0
-
-    while True:
-        part = string[index:index + n]
-        index += n
-
-        if part == '':
-            break
-        yield part
+            # the server doesn't resend the blocks after a reconnection,
+            # so the received blocks are written to the disk first
+            self.logic.flush()
+            self.socket = create_socket()
 
 
 class NetworkSenderThread(threading.Thread):
@@ -152,7 +181,7 @@ class NetworkSenderThread(threading.Thread):
 
     Attributes:
         logger (logging.Logger): The logger of the thread.
-        network_queue (Queue.Queue): The queue of the reciever thread.
+        network_queue (ring.MPSCRing): The queue of the reciever thread.
         running (bool): The flag of the main loop.
         socket (socket.socket): The socket of the client.
     """
@@ -162,7 +191,7 @@ class NetworkSenderThread(threading.Thread):
         Initialize the sender thread.
 
         Args:
-            network_queue (Queue.Queue): The queue of the reciever thread.
+            network_queue (ring.MPSCRing): The queue of the reciever thread.
         """
         current_class = self.__class__
         thread_name = current_class.__name__
@@ -174,6 +203,60 @@ class NetworkSenderThread(threading.Thread):
         self.socket = None
         self.running = True
 
+    def abort_connection(self):
+        """
+        Close the connection in the middle of a message.
+
+        The server drops the partial message when the connection is
+        closed, and the receiver thread reconnects. The messages
+        until then are dropped.
+        """
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+        self.socket = None
+
+    def send_file(self, header, file_path):
+        """
+        Send a message whose content is streamed from a file.
+
+        If the file is truncated while it is sent, the message can't be
+        completed, so the connection is aborted instead of sending a
+        corrupted block.
+
+        Args:
+            header (str): The header of the message.
+            file_path (str): The file containing the content of the message.
+        """
+        size = protocol.get_size(header) - (len(header) - 4)
+
+        try:
+            f = open(file_path, 'rb')
+        except IOError:
+            self.logger.exception(
+                'an error acurred while reading file: %s' % file_path)
+            return
+
+        with f:
+            self.socket.sendall(header)
+
+            left = size
+            while left > 0:
+                part = f.read(min(left, FILE_CHUNK_SIZE))
+
+                # if the file was truncated after the header was built,
+                # abort the connection, so the block is treated as missing
+                if part == '':
+                    self.logger.error(
+                        'file %s was truncated while sending it, '
+                        'closing the connection' % file_path)
+                    self.abort_connection()
+                    return
+
+                self.socket.sendall(part)
+                left -= len(part)
+
     @handle_except('network')
     def run(self):
         """Execute the sender thread."""
@@ -186,11 +269,20 @@ class NetworkSenderThread(threading.Thread):
 
             elif message_type == 'send':
                 net_message = message['message']
+                file_path = message['file_path']
+
+                # messages after an aborted connection are dropped,
+                # until the receiver thread reconnects
+                if self.socket is None:
+                    self.logger.warning('not connected, message dropped')
+                    continue
 
                 self.logger.debug(
                     'sending message of length %s' % len(net_message))
-                for part in split_string(net_message, 1024):
-                    self.socket.send(part)
+                if file_path is not None:
+                    self.send_file(net_message, file_path)
+                else:
+                    self.socket.sendall(net_message)
 
             elif message_type == 'kill':
                 self.running = False
@@ -1,5 +1,5 @@
 """This module contains functions to create the messages from the client."""
-from protocol import __message
+from protocol import __message, __raw_message, __raw_message_header
 
 
 def block(block_type, name, number, content):
@@ -15,11 +15,31 @@ def block(block_type, name, number, content):
     Returns:
         str: Block message.
     """
-    return __message('block',
-                     block_type=block_type,
-                     name=name,
-                     number=number,
-                     content=content)
+    return __raw_message('block', content,
+                         block_type=block_type,
+                         name=name,
+                         number=number)
+
+
+def block_header(block_type, name, number, size):
+    """
+    Create the header of block message.
+
+    The content of the block should be sent right after the header.
+
+    Args:
+        block_type (str): The block type.
+        name (str): The file name.
+        number (int): The block number.
+        size (int): The size of the block content in bytes.
+
+    Returns:
+        str: Block message header.
+    """
+    return __raw_message_header('block', size,
+                                block_type=block_type,
+                                name=name,
+                                number=number)
 
 
 def file_sent(name):
@@ -56,7 +76,8 @@ def storage_state(blocks):
     Create disk_state message.
 
     Args:
-        blocks (list of dict): List of blocks information.
+        blocks (list of tuple): List of blocks information
+            (name, number and type).
         client (str): The client.
 
     Returns:
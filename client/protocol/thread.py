@@ -2,20 +2,23 @@
 import copy
 
 
-def send(message, client='*'):
+def send(message, client='*', file_path=None):
     """
     Create send message.
 
     Args:
         message (str): The message to be sent.
         client (str, optional): The client to send to.
+        file_path (str, optional): File whose content is sent
+            right after the message.
 
     Returns:
         dict: Send message.
     """
     return {'type': 'send',
             'client': client,
-            'message': message
+            'message': message,
+            'file_path': file_path
             }
 
 
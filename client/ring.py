@@ -0,0 +1,111 @@
+"""
+This module contains a ring buffer, used as the queue between the
+threads of the client. Items are put and taken without a lock, unless
+the ring is full or empty.
+"""
+import itertools
+import threading
+
+# marks a slot of the ring that contains no item
+_EMPTY = object()
+
+
+class MPSCRing(object):
+    """
+    Bounded ring buffer queue, with multiple producers and a single consumer.
+
+    The producers don't take a lock to put an item: every put takes
+    a unique ticket from an itertools.count, whose next() is atomic under
+    the GIL, and the ticket selects the slot of the item. When the ring
+    is full, the producers wait on a condition until the consumer frees
+    their slots. When the ring is empty, the consumer waits on an event
+    until the next put.
+
+    Attributes:
+        capacity (int): The number of slots in the ring.
+    """
+
+    def __init__(self, capacity=1024):
+        """
+        Initialize the ring.
+
+        Args:
+            capacity (int, optional): The number of slots in the ring.
+                Must be a power of two.
+        """
+        if capacity <= 0 or capacity & (capacity - 1) != 0:
+            raise ValueError('capacity must be a power of two')
+
+        self.capacity = capacity
+        self.__mask = capacity - 1
+        self.__slots = [_EMPTY] * capacity
+
+        # the ticket of the next put, and of the next get
+        self.__tail = itertools.count()
+        self.__head = 0
+
+        # used to wake the consumer when it waits for an item
+        self.__waiting = False
+        self.__event = threading.Event()
+
+        # used to wake the producers when they wait for a free slot
+        self.__full_waiting = 0
+        self.__not_full = threading.Condition(threading.Lock())
+
+    def put(self, item):
+        """
+        Put an item in the ring.
+
+        If the ring is full, block until the consumer frees a slot.
+
+        Args:
+            item (object): The item.
+        """
+        ticket = next(self.__tail)
+
+        # the slot is free only after the item of the previous
+        # round on the same slot was taken by the consumer
+        if ticket - self.__head >= self.capacity:
+            with self.__not_full:
+                self.__full_waiting += 1
+
+                # check again, the slot could be freed before
+                # the counter was increased
+                while ticket - self.__head >= self.capacity:
+                    self.__not_full.wait()
+                self.__full_waiting -= 1
+
+        self.__slots[ticket & self.__mask] = item
+        if self.__waiting:
+            self.__event.set()
+
+    def get(self):
+        """
+        Remove and return an item from the ring.
+
+        If the ring is empty, block until an item is available.
+
+        Returns:
+            object: The item.
+        """
+        index = self.__head & self.__mask
+
+        while self.__slots[index] is _EMPTY:
+            self.__event.clear()
+            self.__waiting = True
+
+            # check again, the item could be put before the flag was set
+            if self.__slots[index] is _EMPTY:
+                self.__event.wait()
+            self.__waiting = False
+
+        item = self.__slots[index]
+        self.__slots[index] = _EMPTY
+        self.__head += 1
+
+        # wake the producers waiting for the freed slot
+        if self.__full_waiting:
+            with self.__not_full:
+                self.__not_full.notify_all()
+
+        return item
@@ -1,7 +1,6 @@
 """This module contains functions that don't fit to any other module."""
-import os
 import logging
-from glob import glob as old_glob
+import functools
 
 
 def handle_except(logger_name):
@@ -14,10 +13,11 @@ def handle_except(logger_name):
         logger_name (str): The logger name.
 
     """
+    logger = logging.getLogger(logger_name)
+
     def decorator(function):
+        @functools.wraps(function)
         def inner(*args, **kwargs):
-
-            logger = logging.getLogger(logger_name)
             try:
                 return function(*args, **kwargs)
             except Exception:
@@ -38,11 +38,7 @@ def build_file_name(name='*', number='*', block_type='*'):
     Returns:
         str: the file name.
     """
-    return '%(name)s_%(number)s.%(block_type)s' % {
-        'name': name,
-        'number': number,
-        'block_type': block_type
-    }
+    return '%s_%s.%s' % (name, number, block_type)
 
 
 def parse_file_name(file_name):
@@ -53,32 +49,10 @@ def parse_file_name(file_name):
         file_name (str): The file name.
 
     Returns:
-        dict: The parsed file name.
-    """
-    name, rest = file_name.rsplit('_', 1)
-    number, block_type = rest.rsplit('.', 1)
-    return {
-        'name': name,
-        'number': number,
-        'block_type': block_type
-    }
-
-
-def glob(*path_parts):
-    """
-    Return list of files by pattern.
-
-    This function wraps the standard module glob and adds some features.
-    It receives parts of a path and concatenate
-    it to  platform independent path.
-
-    It also add built in unicode support.
-
-    Args:
-        *path_parts: list of path parts.
-
-    Returns:
-        list of matching paths.
+        tuple: The name, the number and the type of the block.
     """
-    path = unicode(os.path.join(*path_parts))
-    return old_glob(path)
+    dot = file_name.rindex('.')
+    underscore = file_name.rindex('_', 0, dot)
+    return (file_name[:underscore],
+            file_name[underscore + 1:dot],
+            file_name[dot + 1:])
@@ -8,6 +8,7 @@ class Database(object):
 
     Attributes:
         conn (TYPE): Description
+        cursor (sqlite3.Cursor): The cursor used by all the queries.
         file_name (TYPE): Description
         logger (TYPE): Description
     """
@@ -25,6 +26,13 @@ class Database(object):
 
         self.file_name = file_name
         self.conn = sqlite3.connect(self.file_name)
+
+        # commits don't wait for the disk on every write
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA temp_store=MEMORY')
+        self.conn.execute('PRAGMA cache_size=-20000')
+
         self.conn.execute('''
         CREATE TABLE IF NOT EXISTS files
         (NAME TEXT,
@@ -34,20 +42,35 @@ class Database(object):
         VALIDATION_LEVEL INT,
         KEY BLOB);''')
 
+        self.cursor = self.conn.cursor()
         self.logger.debug('connected to database')
 
-    def insert(self, record):
+    @staticmethod
+    def __prepare(record):
         """
-        Insert new record to the database.
+        Convert a record to the types of the database columns.
 
         Args:
-            record (tuple): The record to insert to the database.
+            record (tuple): The record.
+
+        Returns:
+            list: The converted record.
         """
-        cursor = self.conn.cursor()
         record = list(record)
         record[0] = unicode(record[0])
         record[5] = sqlite3.Binary(record[5])
-        cursor.execute('INSERT INTO files VALUES(?, ?, ?, ?, ?, ?)', record)
+        return record
+
+    def insert(self, record):
+        """
+        Insert new record to the database.
+
+        Args:
+            record (tuple): The record to insert to the database.
+        """
+        record = self.__prepare(record)
+        self.cursor.execute(
+            'INSERT INTO files VALUES(?, ?, ?, ?, ?, ?)', record)
         self.conn.commit()
         self.logger.debug('record %s inserted' % repr(record))
 
@@ -61,11 +84,10 @@ class Database(object):
         Returns:
             tuple: The required record.
         """
-        cursor = self.conn.cursor()
         file_name = unicode(file_name)
-        cursor.execute('SELECT * FROM files WHERE NAME=?', (file_name,))
+        self.cursor.execute('SELECT * FROM files WHERE NAME=?', (file_name,))
         self.logger.debug('queried record of file \'%s\'' % file_name)
-        return cursor.fetchone()
+        return self.cursor.fetchone()
 
     def query_all(self):
         """
@@ -74,10 +96,9 @@ class Database(object):
         Returns:
             list of tuple: The required records.
         """
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT * FROM files')
+        self.cursor.execute('SELECT * FROM files')
         self.logger.debug('queried all record')
-        return list(cursor)
+        return self.cursor.fetchall()
 
     def delete(self, file_name):
         """
@@ -86,16 +107,14 @@ class Database(object):
         Args:
             file_name (str): The file name.
         """
-        cursor = self.conn.cursor()
         file_name = unicode(file_name)
-        cursor.execute('DELETE FROM files WHERE NAME=?', (file_name,))
+        self.cursor.execute('DELETE FROM files WHERE NAME=?', (file_name,))
         self.conn.commit()
         self.logger.debug('record of file \'%s\' deleted' % file_name)
 
     def delete_all(self):
         """Delete all records from database."""
-        cursor = self.conn.cursor()
-        cursor.execute('DELETE FROM files')
+        self.cursor.execute('DELETE FROM files')
         self.conn.commit()
         self.logger.debug('all records deleted from database')
 
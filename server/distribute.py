@@ -1,45 +1,76 @@
 """The file distribution module.
 """
+from multiprocessing.pool import ThreadPool
+import multiprocessing
 import os
+import mmap
+import itertools
 import threading
 import logging
+import Queue
 
 from utils import handle_except
 import encrypt
 import protocol.server
 import protocol
 
+# the number of threads encrypting blocks of a distributed file
+ENCRYPT_WORKERS = multiprocessing.cpu_count()
+
+# the number of blocks waiting to be encrypted, for every worker
+PENDING_PER_WORKER = 4
+
+# the number of send messages put together in the queue of the logic thread
+BATCH_SIZE = 32
+
 
 class Validator(object):
     """The validator class creates validation blocks.
+
+    The blocks of a validation block must be updated in order, so their
+    hashes are packed one after the other, from the first block.
     """
 
     def __init__(self):
         """Initialize the validator class.
         """
-        self.__data = None
-        self.__blocks = {}
+        self.reset()
 
     def update(self, block_data, number, fillvalue='\x00'):
         """
         Update the internal state of the validator.
 
         Args:
-            block_data (str): Data block to be added to the xor.
+            block_data (str or buffer): Data block to be added to the xor.
             number (int): Number of the Block.
             fillvalue (str, optional): Value to pad shorter blocks.
         """
-        if self.__data is None:
-            self.__data = block_data
-        else:
-            self.__data = encrypt.xor_strings(self.__data, block_data)
-        self.__blocks[number] = encrypt.hash_string(block_data)
+        # the xor is kept as a long integer, and shorter blocks are
+        # padded, so the blocks are aligned to their first byte
+        size = len(block_data)
+        value = encrypt.string_to_long(block_data)
+
+        if size < self.__size:
+            value <<= 8 * (self.__size - size)
+        elif size > self.__size:
+            self.__data <<= 8 * (size - self.__size)
+            self.__size = size
+
+        self.__data ^= value
+        self.__updated = True
+
+        if self.__first is None:
+            self.__first = number
+        self.__hashes.append(encrypt.hash_string(block_data))
 
     def reset(self):
         """Reset the internal state of the validator.
         """
-        self.__data = None
-        self.__blocks = {}
+        self.__data = 0
+        self.__size = 0
+        self.__updated = False
+        self.__first = None
+        self.__hashes = []
 
     def get_data(self):
         """
@@ -48,9 +79,15 @@ class Validator(object):
         Returns:
             str: the metadata block.
         """
+        if self.__updated:
+            data = encrypt.long_to_string(self.__data, self.__size)
+        else:
+            data = None
+
         file_dict = {
-            'hashes': self.__blocks,
-            'xor': self.__data
+            'first': self.__first,
+            'hashes': ''.join(self.__hashes),
+            'xor': data
         }
         return protocol.build(file_dict)
 
@@ -64,14 +101,16 @@ class DistributeThread(threading.Thread):
         callback (func, optional): A callback to be called
                 after the thread finished
         clients (list of str): List of the clients.
-        distribute_queue (Queue.Queue): The queue of the thread.
+        digested_key (str): The encryption key, digested to the key size.
+        distribute_queue (utils.MessageQueue): The queue of the thread.
         duplication_level (int): How many times each block is duplicated.
         file_path (str): The path to target file.
         key (str): The encryption key.
         logger (logging.Logger): The logger of the thread.
-        logic_queue (Queue.Queue): The queue of the logic thread.
+        logic_queue (utils.MessageQueue): The queue of the logic thread.
         validation_level (int): The number of data block that each
             metadata block is covering.
+        workers (int): The number of threads encrypting the blocks.
     """
 
     def __init__(self, file_path,
@@ -93,8 +132,8 @@ class DistributeThread(threading.Thread):
             validation_level (int): The number of data block that each
             clients (list of str): List of the clients.
             key (str): The encryption key.
-            distribute_queue (Queue.Queue): The queue of the thread.
-            logic_queue (Queue.Queue): The queue of the logic thread.
+            distribute_queue (utils.MessageQueue): The queue of the thread.
+            logic_queue (utils.MessageQueue): The queue of the logic thread.
             callback (func, optional): A callback to be called
                 after the thread finished
             metadata block is covering.
@@ -112,34 +151,122 @@ class DistributeThread(threading.Thread):
         self.validation_level = validation_level
         self.clients = clients
         self.key = key
+        self.digested_key = encrypt.digest_key(key)
         self.distribute_queue = distribute_queue
         self.logic_queue = logic_queue
         self.callback = callback
+        self.workers = ENCRYPT_WORKERS
+
+        # the pool encrypting the blocks, and the slots bounding
+        # the blocks waiting for it, created when the thread runs
+        self.__pool = None
+        self.__slots = None
 
-    def send_block(self, client, block_type, name, number, content):
+        # send messages waiting to be put in the logic queue as a batch
+        self.__pending = []
+        self.__pending_lock = threading.Lock()
+
+        # set by the control thread when an exit message is received,
+        # and by the thread when the distribution is over
+        self.__stop = threading.Event()
+        self.__finished = threading.Event()
+
+    def send_block(self, clients, block_type, name, number, content):
         """
         Send block to the logic thread.
 
+        The block is encrypted and built once, and the same
+        message is sent to all the given clients. The messages are
+        put in the logic queue in batches.
+
         Args:
-            client (str): The client ip address.
+            clients (list of str): The clients ip addresses.
             block_type (str): The type of the block.
             name (str): The name of the file
             number (int): The number of the block.
-            content (str): The content of the block.
+            content (str or buffer): The content of the block.
         """
-        log_params = (block_type, number, client)
-        self.logger.debug('%s block number %s sent to %s' % log_params)
-
-        encrypted = encrypt.encrypt(self.key, content)
+        encrypted = encrypt.aes_ctr(self.digested_key, content)
 
         net_message = protocol.server.send_block(
             block_type=block_type,
-            name=os.path.basename(self.file_path),
+            name=name,
             number=number,
             content=encrypted
         )
-        message = protocol.thread.send(message=net_message, client=client)
-        self.logic_queue.put(message)
+
+        log_params = (block_type, number, ', '.join(clients))
+        self.logger.debug('%s block number %s sent to %s' % log_params)
+
+        messages = [protocol.thread.send(message=net_message, client=client)
+                    for client in clients]
+
+        with self.__pending_lock:
+            # if the distribution was canceled, the block isn't sent
+            if self.__stop.is_set():
+                return
+
+            self.__pending.extend(messages)
+            if len(self.__pending) < BATCH_SIZE:
+                return
+            messages = self.__pending
+            self.__pending = []
+
+        self.logic_queue.put(protocol.thread.batch(messages=messages))
+
+    def flush_blocks(self):
+        """Put the remaining send messages in the logic queue."""
+        with self.__pending_lock:
+            messages = self.__pending
+            self.__pending = []
+
+        if messages:
+            self.logic_queue.put(protocol.thread.batch(messages=messages))
+
+    def __send_block_task(self, kwargs):
+        """
+        Send block to the logic thread, from a worker of the pool.
+
+        Args:
+            kwargs (dict): The arguments of send_block.
+        """
+        try:
+            # blocks queued before the distribution was canceled are dropped
+            if not self.__stop.is_set():
+                self.send_block(**kwargs)
+        except:
+            self.logger.exception('an error occurred while sending block %s' %
+                                  kwargs['number'])
+        finally:
+            self.__slots.release()
+
+    def queue_block(self, **kwargs):
+        """
+        Queue a block to be sent by the encryption pool.
+
+        If too many blocks are waiting, block until a worker is free,
+        so the memory of the waiting blocks stays bounded.
+
+        Args:
+            **kwargs: The arguments of send_block.
+        """
+        self.__slots.acquire()
+        self.__pool.apply_async(self.__send_block_task, (kwargs,))
+
+    def control(self):
+        """
+        Wait for messages from the logic thread, while the file is
+        distributed, so the distribution loop doesn't poll the queue.
+        """
+        while not self.__finished.is_set():
+            try:
+                message = self.distribute_queue.get(timeout=0.1)
+            except Queue.Empty:
+                continue
+
+            if message['type'] == 'exit':
+                self.__stop.set()
+                return
 
     def exit_thread(self, success=True):
         """Send exit message to the logic thread.
@@ -174,46 +301,55 @@ class DistributeThread(threading.Thread):
         block_size = self.block_size
         base_name = os.path.basename(self.file_path)
 
-        # opening the target file for reading
+        # opening the target file for reading, and mapping it to memory,
+        # so the blocks are read from the page cache (an empty file
+        # can't be mapped, and has no blocks anyway)
         target_file = open(self.file_path, 'rb')
+        if file_size > 0:
+            target_map = mmap.mmap(
+                target_file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            target_map = ''
+
+        # the blocks are views of the mapped file, so they aren't copied
+        # (the map is closed only after the pool is done with them)
+        blocks = (buffer(target_map, offset, block_size)
+                  for offset in xrange(0, file_size, block_size))
 
         self.logger.debug('"%s" opened, size is %s' %
                           (self.file_path, file_size))
         self.logger.info('distributing file %s' % base_name)
 
         # calculating several parameters
-        block_number = file_size / self.block_size
-        if file_size % self.block_size != 0:
-            block_number += 1
+        block_number = (file_size + block_size - 1) // block_size
         self.logger.info('calculated block number is %s' % block_number)
 
-        # initialize the loop variables
-        count = 1
+        # initialize the loop variables, the levels are read once
+        # instead of on every block
+        validation_level = self.validation_level
+        duplicates = xrange(self.duplication_level)
+        count = 0
         validation_count = 1
-        data_client_pointer = 0
-        metadata_client_pointer = 0
-        running = True
-        data = None
+        data_clients_cycle = itertools.cycle(self.clients)
+        metadata_clients_cycle = itertools.cycle(self.clients)
         validator = Validator()
 
-        while running:
+        # the blocks are encrypted by a pool of threads, while this
+        # thread keeps reading and validating the next blocks
+        self.__pool = ThreadPool(self.workers)
+        self.__slots = threading.BoundedSemaphore(
+            PENDING_PER_WORKER * self.workers)
 
-            # non block receive message
-            try:
-                message = self.distribute_queue.get(timeout=0.1)
-            except:
-                pass
-            else:
-                if message['type'] == 'exit':
-                    self.exit_thread(success=False)
-                    return
-
-            # creating the block
-            data = target_file.read(block_size)
-
-            # if no data left, exit the loop
-            if data == '':
-                running = False
+        # the control thread receives the messages of the logic thread
+        control_thread = threading.Thread(
+            target=self.control, name=self.name + 'Control')
+        control_thread.daemon = True
+        control_thread.start()
+
+        for count, data in enumerate(blocks, 1):
+
+            # if the thread was asked to exit, stop distributing
+            if self.__stop.is_set():
                 break
 
             self.logger.debug('adding block %s to validation block %s' %
@@ -221,10 +357,10 @@ class DistributeThread(threading.Thread):
             validator.update(data, count)
 
             # if the enough blocks sent, create and send validation block
-            if count % self.validation_level == 0:
+            if count % validation_level == 0:
 
-                self.send_block(
-                    client=self.clients[data_client_pointer],
+                self.queue_block(
+                    clients=[next(metadata_clients_cycle)],
                     block_type=protocol.METADATA_BLOCK,
                     name=base_name,
                     number=validation_count,
@@ -233,39 +369,53 @@ class DistributeThread(threading.Thread):
                 validator.reset()
                 self.logger.debug('resetting validation block %s' %
                                   validation_count)
-                metadata_client_pointer += 1
                 validation_count += 1
 
-            if metadata_client_pointer >= len(self.clients):
-                metadata_client_pointer = 0
-
             # duplicate the block to different clients
-            for i in xrange(self.duplication_level):
-                self.send_block(
-                    client=self.clients[data_client_pointer],
-                    block_type=protocol.DATA_BLOCK,
-                    name=base_name,
-                    number=count,
-                    content=data
-                )
-                data_client_pointer += 1
+            data_clients = [next(data_clients_cycle) for i in duplicates]
 
-                if data_client_pointer >= len(self.clients):
-                    data_client_pointer = 0
+            self.queue_block(
+                clients=data_clients,
+                block_type=protocol.DATA_BLOCK,
+                name=base_name,
+                number=count,
+                content=data
+            )
 
-            count += 1
+        self.__finished.set()
+
+        # if the distribution was canceled, the queued blocks return
+        # without being sent, and the waiting batch is dropped
+        if self.__stop.is_set():
+            self.__pool.close()
+            self.__pool.join()
+            with self.__pending_lock:
+                self.__pending = []
+            if file_size > 0:
+                target_map.close()
+            target_file.close()
+            self.exit_thread(success=False)
+            return
 
         # if the last blocks aren't validated, create validation block
-        if file_size % self.block_size != 0:
-            self.send_block(
-                client=self.clients[metadata_client_pointer],
+        pending_validation = count % validation_level != 0
+        if pending_validation:
+            self.queue_block(
+                clients=[next(metadata_clients_cycle)],
                 block_type=protocol.METADATA_BLOCK,
                 name=base_name,
                 number=validation_count,
                 content=validator.get_data()
             )
 
+        # wait for the pool to send the queued blocks
+        self.__pool.close()
+        self.__pool.join()
+        self.flush_blocks()
+
         # executing exit operations
+        if file_size > 0:
+            target_map.close()
         target_file.close()
 
         self.callback()
@@ -1,18 +1,66 @@
 """This module contains encryption functions."""
+import binascii
 import hashlib
-import itertools
 
 import pyaes
 
+# the cryptography package uses AES instructions of the processor,
+# pyaes is used if it is not installed
+try:
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives.ciphers import Cipher
+    from cryptography.hazmat.primitives.ciphers import algorithms, modes
+except ImportError:
+    Cipher = None
+
 
 block_size = 32
 
+# the size of a raw hash
+hash_size = hashlib.sha256().digest_size
+
+# the first counter block of the CTR mode, like the default counter of pyaes
+counter_block = '\x00' * 15 + '\x01'
+
+
+def string_to_long(string):
+    """
+    Convert a string to a long integer, first character is most significant.
+
+    Args:
+        string (str): The string.
+
+    Returns:
+        long: The integer.
+    """
+    if not string:
+        return 0
+    return int(binascii.hexlify(string), 16)
+
+
+def long_to_string(value, size):
+    """
+    Convert a long integer back to a string.
+
+    Args:
+        value (long): The integer.
+        size (int): The size of the string.
+
+    Returns:
+        str: The string.
+    """
+    if size == 0:
+        return ''
+    return binascii.unhexlify('%0*x' % (size * 2, value))
+
 
 def xor_strings(*strings):
     """
     Xor multiple strings.
 
     Padding shorter strings to match to the longest string.
+    The strings are converted to long integers, so the xor is done
+    by the interpreter in C instead of character by character.
 
     Args:
         *strings: Strings to be xored.
@@ -20,21 +68,13 @@ def xor_strings(*strings):
     Returns:
         str: The xor of the strings.
     """
-    data_zip = list(itertools.izip_longest(*strings, fillvalue='\x00'))
-
-    def xor_line(line):
-        """Auxillary function to xor strings.
+    size = max(map(len, strings)) if strings else 0
 
-        Args:
-            line (str): on line of the string.
+    result = 0
+    for string in strings:
+        result ^= string_to_long(string.ljust(size, '\x00'))
 
-        Returns:
-            TYPE: Xor of a line.
-        """
-        return reduce(lambda a, b: chr(ord(a) ^ ord(b)), line)
-
-    char_list = map(lambda x: xor_line(x), data_zip)
-    return ''.join(char_list)
+    return long_to_string(result, size)
 
 
 def hash_string(string):
@@ -45,9 +85,28 @@ def hash_string(string):
         string (str): String for hashing.
 
     Returns:
-        str: Hash of the string.
+        str: Hash of the string, as raw bytes.
     """
-    return hashlib.sha256(string).hexdigest()
+    return hashlib.sha256(string).digest()
+
+
+def check_hash(string, string_hash):
+    """
+    Check if a string matches a hash.
+
+    Metadata blocks created by older versions contain hex encoded hashes,
+    so these are checked too.
+
+    Args:
+        string (str): The string.
+        string_hash (str): The hash, as raw bytes or in hex.
+
+    Returns:
+        bool: True if the hash of the string is the given hash.
+    """
+    if len(string_hash) == 2 * hash_size:
+        return hashlib.sha256(string).hexdigest() == string_hash.lower()
+    return hash_string(string) == string_hash
 
 
 def digest_key(key):
@@ -60,7 +119,32 @@ def digest_key(key):
     Returns:
         str: The digested string.
     """
-    return hash_string(key)[:block_size]
+    # the key is derived from the hex digest, like the keys
+    # of the files which were already distributed
+    return hashlib.sha256(key).hexdigest()[:block_size]
+
+
+def aes_ctr(key, value):
+    """
+    Apply the AES256 cipher in CTR mode on a string.
+
+    In CTR mode, encryption and decryption are the same operation.
+
+    Args:
+        key (str): The digested key.
+        value (str or buffer): The text.
+
+    Returns:
+        str: The transformed text.
+    """
+    if Cipher is not None:
+        cipher = Cipher(
+            algorithms.AES(key), modes.CTR(counter_block), default_backend())
+        encryptor = cipher.encryptor()
+        return encryptor.update(value) + encryptor.finalize()
+
+    cipher = pyaes.AESModeOfOperationCTR(key)
+    return cipher.encrypt(value)
 
 
 def encrypt(key, value):
@@ -75,9 +159,7 @@ def encrypt(key, value):
         str: The cipher text.
     """
     key = digest_key(key)
-    cipher = pyaes.AESModeOfOperationCTR(key)
-    crypted = cipher.encrypt(value)
-    return crypted
+    return aes_ctr(key, value)
 
 
 def decrypt(key, value):
@@ -92,5 +174,4 @@ def decrypt(key, value):
         str: The plain text.
     """
     key = digest_key(key)
-    cipher = pyaes.AESModeOfOperationCTR(key)
-    return cipher.decrypt(value)
+    return aes_ctr(key, value)
@@ -1,8 +1,16 @@
 """This module handle the user interface."""
-import threading
+import collections
+import errno
+import functools
 import logging
 import os
 
+# pipes can be watched by the main loop only where fcntl is available
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
 import gtk
 import gobject
 
@@ -11,26 +19,100 @@ from utils import handle_except
 
 gobject.threads_init()
 
-
-def get_selection(treeview, column):
+# the icons of the thread types, and of the block types
+THREAD_TYPE_ICONS = {
+    'distribute': gtk.STOCK_GO_UP,
+    'restore': gtk.STOCK_GO_DOWN,
+    'reconstruct': gtk.STOCK_CLEAR
+}
+BLOCK_TYPE_ICONS = {
+    'data': gtk.STOCK_FILE,
+    'metadata': gtk.STOCK_FIND_AND_REPLACE
+}
+
+# the units of the displayed sizes, each is 1024 times the previous
+SIZE_UNITS = ('', 'K', 'M', 'G', 'T', 'P', 'E', 'Z', 'Y')
+
+# the number of rows added to a long list of blocks on every idle callback
+FILL_CHUNK_SIZE = 500
+
+# milliseconds to wait for the cursor to stop, before showing its blocks
+CURSOR_DELAY = 30
+
+# the widgets used by the callbacks, kept as attributes of the gui
+WIDGETS = (
+    'block_number_scale',
+    'clients_blocks_tree_view',
+    'clients_clients_tree_view',
+    'clients_store',
+    'duplication_scale',
+    'file_status_blocks_tree_view',
+    'file_status_files_tree_view',
+    'file_system_store',
+    'file_system_tree_view',
+    'upload_file_chooser',
+    'upload_window',
+    'validation_scale',
+    'waiting_files_tree_view'
+)
+
+# the toolbars whose buttons are disabled when no client is connected
+TOOLBARS = ('file_system_toolbar', 'waiting_files_toolbar', 'clients_toolbar')
+
+# the messages that replace the previous message of their type (and client),
+# so only the latest of them is processed
+SNAPSHOT_TYPES = ('file_list', 'thread_list', 'client_list', 'storage_state')
+
+
+def get_selection(treeview, *columns):
     """
     Return the selection of the given tree view.
 
+    All the columns are read from the model in a single call.
+
     Args:
         treeview (gtk.TreeView): The tree view containing the selection.
-        column (int, optional): The column containing the value.
+        *columns: The columns containing the values.
 
     Returns:
         object: The Value in the selected row, in the given column,
+                a tuple of the values if several columns are given,
                 or "None", if none of the rows are selected.
     """
     selection = treeview.get_selection()
     selection_store, selection_iter = selection.get_selected()
-    if selection_iter is not None:
-        return selection_store.get_value(selection_iter, column)
-    else:
+    if selection_iter is None:
         return None
 
+    values = selection_store.get(selection_iter, *columns)
+    if len(columns) == 1:
+        return values[0]
+    return values
+
+
+def repopulate(treeview, records):
+    """
+    Replace the rows of the model of the given tree view.
+
+    The model is detached from the tree view while it is filled,
+    so the view is updated once, instead of on every row.
+
+    Args:
+        treeview (gtk.TreeView): The tree view.
+        records (list of tuple): The new rows.
+
+    Returns:
+        list of gtk.TreeIter: The iters of the new rows.
+    """
+    store = treeview.get_model()
+    treeview.set_model(None)
+
+    store.clear()
+    iters = [store.append(record) for record in records]
+
+    treeview.set_model(store)
+    return iters
+
 
 def size_format(num):
     """
@@ -42,24 +124,99 @@ def size_format(num):
     Returns:
         str: String representation of the bytes.
     """
-    unit_list = ['', 'K', 'M', 'G', 'T', 'P', 'E', 'Z']
-    for unit in unit_list:
-        if num < 1024.0:
-            return "%3.1f%sB" % (num, unit)
-        num /= 1024.0
-    return "%.1f%sB" % (num, 'Y')
+    # every unit is 10 bits, so the unit is found from the bit length
+    if num < 1024:
+        unit = 0
+    else:
+        unit = min((int(num).bit_length() - 1) // 10, len(SIZE_UNITS) - 1)
+    return "%3.1f%sB" % (num / float(1 << (10 * unit)), SIZE_UNITS[unit])
+
+
+@handle_except('gui')
+def format_size_callback(column, cell, model, row_iter, data):
+    """
+    Format a column that display a size in bytes, to be human readable.
+
+    Args:
+        column (gtk.TreeViewColumn): The column.
+        cell (gtk.CellRenderer): The cell renderer.
+        model (gtk.TreeStore): The tree model.
+        row_iter (gtk.TreeIter): The Iter of the current row.
+        data (object): Additional data.
+    """
+    value = model.get_value(row_iter, data)
+    cell.set_property('text', size_format(value))
+
+
+@handle_except('gui')
+def disk_state_callback(column, cell, model, row_iter, data=None):
+    """
+    Calculate and display the disk state of a client.
+
+    Args:
+        column (gtk.TreeViewColumn): The column.
+        cell (gtk.CellRenderer): The cell renderer.
+        model (gtk.TreeStore): The tree model.
+        row_iter (gtk.TreeIter): The Iter of the current row.
+        data (object): Additional data.
+    """
+    total, used = model.get(row_iter, 1, 2)
+    if total != 0:
+        disk_state = 100 * used // total
+    else:
+        disk_state = 0
+    cell.set_property('value', disk_state)
+
+
+@handle_except('gui')
+def free_space_callback(column, cell, model, row_iter, data=None):
+    """
+    Calculate and display the free space of a client.
+
+    Args:
+        column (gtk.TreeViewColumn): The column.
+        cell (gtk.CellRenderer): The cell renderer.
+        model (gtk.TreeStore): The tree model.
+        row_iter (gtk.TreeIter): The Iter of the current row.
+        data (object): Additional data.
+    """
+    total, used = model.get(row_iter, 1, 2)
+    cell.set_property('text', size_format(total - used))
 
 
 class Gui(object):
     """
     The class of the user interface.
 
+    Besides the attributes below, the widgets in WIDGETS are
+    attributes of the gui, by their names in the builder.
+
     Attributes:
         block_dict (dict): Contains information about the distributed blocks.
         builder (gtk.Builder): The builder of the gui.
-        gui_queue (Queue.Queue): The queue of the thread.
-        logic_queue (Queue.Queue): The queue of the logic thread.
+        buttons_enabled (bool): True if the buttons are enabled, False if
+            they are disabled, None before they are set.
+        client_iters (dict): The rows of the clients in the clients store,
+            by the clients' ip.
+        command_dict (dict): The handlers of the messages, by their type.
+        delayed_sources (dict): The timeouts of the delayed callbacks,
+            by the callbacks.
+        disk_states (dict): The displayed disk states, by the clients' ip.
+        file_blocks (dict): The rows of the blocks of every file,
+            by the files' names, and then by the clients' ip.
+        fill_sources (dict): The idle callbacks filling the tree views,
+            by the tree views.
+        file_iters (dict): The rows of the files in the file system store,
+            by the files' names.
+        gui_queue (GuiQueue): The queue of the thread.
+        icons (dict): The rendered icons of the tree views,
+            by their stock id.
+        logic_queue (utils.MessageQueue): The queue of the logic thread.
         logger (logging.Logger): The logger of the class.
+        pending_disk_states (dict): The disk states which are not
+            displayed yet, by the clients' ip.
+        thread_records (list of tuple): The displayed running threads.
+        toolbars (list of gtk.Toolbar): The toolbars of the buttons.
     """
 
     def __init__(self, gui_queue, logic_queue, file_name='gui.xml'):
@@ -67,8 +224,8 @@ class Gui(object):
         Initialize the gui thread.
 
         Args:
-            gui_queue (Queue.Queue): The queue of the thread.
-            logic_queue (Queue.Queue): The queue of the logic thread.
+            gui_queue (GuiQueue): The queue of the thread.
+            logic_queue (utils.MessageQueue): The queue of the logic thread.
             file_name (str, optional): The XML file that describes the gui.
         """
         self.logger = logging.getLogger('gui')
@@ -76,15 +233,50 @@ class Gui(object):
         self.gui_queue = gui_queue
         self.logic_queue = logic_queue
 
+        # messages put in the queue are processed by the main loop
+        self.gui_queue.callback = self.process_message
+
         # the builder is used to access the different widgets of the gui
         self.builder = gtk.Builder()
         self.builder.add_from_file(file_name)
 
+        # the widgets are looked up once, instead of on every callback
+        for name in WIDGETS:
+            setattr(self, name, self.builder.get_object(name))
+        self.toolbars = [self.builder.get_object(name) for name in TOOLBARS]
+
         # block dict containing information about the block.
         # the keys are the clients' ip, and the values are list
         # of block records
         self.block_dict = {}
 
+        # callbacks of the cursors, which wait for the cursor to stop
+        self.delayed_sources = {}
+
+        # long lists of blocks are filled in chunks by idle callbacks
+        self.fill_sources = {}
+
+        # the state of the buttons, so they are changed only when needed
+        self.buttons_enabled = None
+
+        # the blocks by file, so the blocks of a file are found without
+        # scanning the blocks of all the clients
+        self.file_blocks = {}
+
+        # the rows of the clients, so a client is found without a scan
+        self.client_iters = {}
+
+        # the rows of the files, so the files are updated in place
+        self.file_iters = {}
+
+        # the displayed threads, so an unchanged list isn't displayed again
+        self.thread_records = None
+
+        # disk states are displayed together, when no other message waits,
+        # and only if they are different from the displayed disk states
+        self.pending_disk_states = {}
+        self.disk_states = {}
+
         gtk.widget_set_default_direction(gtk.TEXT_DIR_LTR)
 
         # adjust the main window
@@ -99,6 +291,24 @@ class Gui(object):
             label_text = label.get_text()
             label.set_property('width-chars', len(label_text) - 1)
 
+        # render the icons of the tree views once, instead of looking
+        # them up in the icon theme for every row that is drawn
+        stock_ids = (THREAD_TYPE_ICONS.values() + BLOCK_TYPE_ICONS.values() +
+                     [gtk.STOCK_CANCEL])
+        self.icons = dict(
+            (stock_id, window.render_icon(stock_id, gtk.ICON_SIZE_MENU))
+            for stock_id in stock_ids)
+
+        # the dict dispatch a message type to a handler
+        self.command_dict = {
+            'file_list': self.file_list,
+            'thread_list': self.thread_list,
+            'storage_state': self.storage_state,
+            'client_list': self.client_list,
+            'disk_state': self.disk_state,
+            'error': self.error
+        }
+
         # add spacial column data rendering to the tree views
         self.add_tree_view_data_renderers()
 
@@ -123,9 +333,9 @@ class Gui(object):
             'on_waiting_files_cancel_clicked':
                 self.waiting_files_cancel_clicked,
             'on_file_status_files_tree_view_cursor_changed':
-                self.file_status_callback,
+                functools.partial(self.delay, self.file_status_callback),
             'on_clients_clients_tree_view_cursor_changed':
-                self.clients_callback,
+                functools.partial(self.delay, self.clients_callback),
             'on_clients_refresh_clicked':
                 self.clients_refresh_clicked,
             'on_clients_delete_clicked':
@@ -152,102 +362,17 @@ class Gui(object):
             column = self.builder.get_object(column_name)
             column.set_cell_data_func(cell, callback, data)
 
-        @handle_except('gui')
-        def format_size_callback(column, cell, model, row_iter, data):
-            """
-            Format a column that display a size in bytes, to be human readable.
-
-            Args:
-                column (gtk.TreeViewColumn): The column.
-                cell (gtk.CellRenderer): The cell renderer.
-                model (gtk.TreeStore): The tree model.
-                row_iter (gtk.TreeIter): The Iter of the current row.
-                data (object): Additional data.
-            """
-            value = model.get_value(row_iter, data)
-            cell.set_property('text', size_format(value))
-
         set_view_func('file_system_size_cell', 'file_system_size_column',
                       format_size_callback, 1)
 
-        @handle_except('gui')
-        def set_thread_type_callback(column, cell, model, row_iter, data=None):
-            """
-            Set the icon in row in the 'waiting files' view.
-
-            Args:
-                column (gtk.TreeViewColumn): The column.
-                cell (gtk.CellRenderer): The cell renderer.
-                model (gtk.TreeStore): The tree model.
-                row_iter (gtk.TreeIter): The Iter of the current row.
-                data (object): Additional data.
-            """
-            model_index = 0 if data is None else data
-            value = model.get_value(row_iter, model_index).lower()
-
-            if value == 'distribute':
-                stock_id = gtk.STOCK_GO_UP
-            elif value == 'restore':
-                stock_id = gtk.STOCK_GO_DOWN
-            elif value == 'reconstruct':
-                stock_id = gtk.STOCK_CLEAR
-            else:
-                stock_id = gtk.STOCK_CANCEL
-
-            cell.set_property('stock-id', stock_id)
-
         set_view_func('waiting_files_type_cell', 'waiting_files_type_column',
-                      set_thread_type_callback)
+                      self.set_thread_type_callback)
 
         set_view_func('waiting_files_size_cell', 'waiting_files_size_column',
                       format_size_callback, 2)
 
-        @handle_except('gui')
-        def set_block_type_callback(column, cell, model, row_iter, data=None):
-            """
-            Set the icon in a row in several block displays.
-
-            Args:
-                column (gtk.TreeViewColumn): The column.
-                cell (gtk.CellRenderer): The cell renderer.
-                model (gtk.TreeStore): The tree model.
-                row_iter (gtk.TreeIter): The Iter of the current row.
-                data (object): Additional data.
-            """
-            model_index = 0 if data is None else data
-            value = model.get_value(row_iter, model_index).lower()
-
-            if value == 'data':
-                stock_id = gtk.STOCK_FILE
-            elif value == 'metadata':
-                stock_id = gtk.STOCK_FIND_AND_REPLACE
-            else:
-                stock_id = gtk.STOCK_CANCEL
-
-            cell.set_property('stock-id', stock_id)
-
         set_view_func('file_status_type_cell', 'file_status_type_column',
-                      set_block_type_callback)
-
-        @handle_except('gui')
-        def disk_state_callback(column, cell, model, row_iter, data=None):
-            """
-            Calculate and display the disk state of a client.
-
-            Args:
-                column (gtk.TreeViewColumn): The column.
-                cell (gtk.CellRenderer): The cell renderer.
-                model (gtk.TreeStore): The tree model.
-                row_iter (gtk.TreeIter): The Iter of the current row.
-                data (object): Additional data.
-            """
-            total = model.get_value(row_iter, 1)
-            free = model.get_value(row_iter, 2)
-            if total != 0:
-                disk_state = 100 * (free / (total * 1.0))
-            else:
-                disk_state = 0
-            cell.set_property('value', disk_state)
+                      self.set_block_type_callback)
 
         set_view_func('clients_disk_state_cell', 'clients_disk_state_column',
                       disk_state_callback)
@@ -258,27 +383,51 @@ class Gui(object):
         set_view_func('clients_total_space_cell', 'clients_total_space_column',
                       format_size_callback, 1)
 
-        @handle_except('gui')
-        def free_space_callback(column, cell, model, row_iter, data=None):
-            """
-            Calculate and display the free space of a client.
-
-            Args:
-                column (gtk.TreeViewColumn): The column.
-                cell (gtk.CellRenderer): The cell renderer.
-                model (gtk.TreeStore): The tree model.
-                row_iter (gtk.TreeIter): The Iter of the current row.
-                data (object): Additional data.
-            """
-            total = model.get_value(row_iter, 1)
-            free = model.get_value(row_iter, 2)
-            cell.set_property('text', size_format(total - free))
-
         set_view_func('clients_free_space_cell', 'clients_free_space_column',
                       free_space_callback)
 
         set_view_func('clients_blocks_type_cell', 'clients_blocks_type_column',
-                      set_block_type_callback)
+                      self.set_block_type_callback)
+
+    @handle_except('gui')
+    def set_thread_type_callback(self, column, cell, model, row_iter,
+                                 data=None):
+        """
+        Set the icon in row in the 'waiting files' view.
+
+        Args:
+            column (gtk.TreeViewColumn): The column.
+            cell (gtk.CellRenderer): The cell renderer.
+            model (gtk.TreeStore): The tree model.
+            row_iter (gtk.TreeIter): The Iter of the current row.
+            data (object): Additional data.
+        """
+        # the thread types are set in lowercase by the logic thread
+        model_index = 0 if data is None else data
+        value = model.get_value(row_iter, model_index)
+
+        stock_id = THREAD_TYPE_ICONS.get(value, gtk.STOCK_CANCEL)
+        cell.set_property('pixbuf', self.icons[stock_id])
+
+    @handle_except('gui')
+    def set_block_type_callback(self, column, cell, model, row_iter,
+                                data=None):
+        """
+        Set the icon in a row in several block displays.
+
+        Args:
+            column (gtk.TreeViewColumn): The column.
+            cell (gtk.CellRenderer): The cell renderer.
+            model (gtk.TreeStore): The tree model.
+            row_iter (gtk.TreeIter): The Iter of the current row.
+            data (object): Additional data.
+        """
+        # the block types are lowercased when they are received
+        model_index = 0 if data is None else data
+        value = model.get_value(row_iter, model_index)
+
+        stock_id = BLOCK_TYPE_ICONS.get(value, gtk.STOCK_CANCEL)
+        cell.set_property('pixbuf', self.icons[stock_id])
 
     @handle_except('gui')
     def process_message(self, message):
@@ -289,77 +438,201 @@ class Gui(object):
             message (dict): The received message.
         """
         message_type = message['type']
-        self.logger.debug('received message of type %s' % message_type)
-
-        # if the message is 'file_list', update the display
-        if message_type == 'file_list':
-            files = message['files']
-            file_system_store = self.builder.get_object('file_system_store')
-            file_system_store.clear()
-            for f in files:
-                file_system_store.append(f)
-
-        # if the message is 'thread_list', update the gui.
-        elif message_type == 'thread_list':
-            waiting_files_store = self.builder.get_object(
-                'waiting_files_store')
-            waiting_files_store.clear()
-
-            threads = message['thread_list']
-            for ident in threads:
-                thread = threads[ident]
-
-                record = (thread['thread_type'], thread['name'],
-                          thread['file_size'], thread['block_number'],
-                          thread['duplication'], thread['validation'])
-                waiting_files_store.append(record)
-
-        # if the message is 'storage_state', update the display
-        elif message_type == 'storage_state':
-            client = message['client']
-            self.block_dict[client] = message['blocks']
-            self.logger.debug(
-                'list of blocks and clients:\n%s' % self.block_dict)
-
-        # if the message is 'client_list', update the gui.
-        elif message_type == 'client_list':
-            clients_store = self.builder.get_object('clients_store')
-            clients_store.clear()
-            self.builder.get_object('clients_blocks_store').clear()
-
-            clients = message['clients']
-
-            # if no clients are connected, lock the gui, else release it
-            buttons_state = len(clients) != 0
-            self.control_buttons(buttons_state)
-
-            for client in clients:
-                clients_store.append((client, 0, 0))
-            self.block_dict = {
-                k: v for k, v in self.block_dict.iteritems() if k in clients}
-
-        # if the message is 'disk_state', update the display
-        elif message_type == 'disk_state':
-            clients_store = self.builder.get_object('clients_store')
-            for client in clients_store:
-                client_iter = client.iter
-                client_ip = clients_store.get(client_iter, 0)[0]
-
-                if client_ip == message['client']:
-
-                    total = message['total']
-                    free = message['free']
-                    clients_store.set(
-                        client_iter, 1, total, 2, total - free)
-
-        # if the message is 'error', display error message.
-        elif message_type == 'error':
-            self.display_error(message['message'])
-
-        # else, log warning
+        self.logger.debug('received message of type %s', message_type)
+
+        if message_type in self.command_dict:
+            self.command_dict[message_type](message)
         else:
             self.logger.warning('unknown message type: ' + message_type)
 
+    def file_list(self, message):
+        """
+        Update the displayed files in place,
+        so the selection and the scroll position are kept.
+
+        Args:
+            message (dict): The file_list message.
+        """
+        files = [tuple(f) for f in message['files']]
+        names = set(f[0] for f in files)
+        file_system_store = self.file_system_store
+
+        # remove the files which are not in the storage anymore
+        for name in self.file_iters.keys():
+            if name not in names:
+                file_system_store.remove(self.file_iters.pop(name))
+
+        # update the changed files, and add the new files
+        for f in files:
+            file_iter = self.file_iters.get(f[0])
+            if file_iter is None:
+                self.file_iters[f[0]] = file_system_store.append(f)
+            elif tuple(file_system_store[file_iter]) != f:
+                file_system_store[file_iter] = f
+
+    def thread_list(self, message):
+        """
+        Update the displayed running threads.
+
+        Args:
+            message (dict): The thread_list message.
+        """
+        # the rows are built by the logic thread, and the thread list is
+        # sent again on every change, so usually most of it is unchanged
+        records = message['thread_list']
+        if records == self.thread_records:
+            return
+        self.thread_records = records
+
+        repopulate(self.waiting_files_tree_view, records)
+
+    def storage_state(self, message):
+        """
+        Update the blocks of a client.
+
+        Args:
+            message (dict): The storage_state message.
+        """
+        client = message['client']
+
+        # the block types are lowercased once, instead of on every draw
+        blocks = [(name, number, block_type.lower())
+                  for name, number, block_type in message['blocks']]
+
+        self.block_dict[client] = blocks
+        self.index_blocks(client, blocks)
+        self.logger.debug('list of blocks and clients:\n%s', self.block_dict)
+
+    def client_list(self, message):
+        """
+        Update the displayed clients.
+
+        Args:
+            message (dict): The client_list message.
+        """
+        self.repopulate_in_chunks(self.clients_blocks_tree_view, [])
+
+        clients = message['clients']
+
+        # if no clients are connected, lock the gui, else release it
+        buttons_state = len(clients) != 0
+        self.control_buttons(buttons_state)
+
+        records = [(client, 0, 0) for client in clients]
+        client_iters = repopulate(self.clients_clients_tree_view, records)
+        self.client_iters = dict(zip(clients, client_iters))
+        self.disk_states = {}
+
+        # keep the blocks of the connected clients only, only the blocks
+        # of the disconnected clients are removed
+        for client in self.block_dict.viewkeys() - set(clients):
+            self.index_blocks(client, [])
+            del self.block_dict[client]
+
+    def index_blocks(self, client, blocks):
+        """
+        Replace the blocks of a client in the index of the blocks by file.
+
+        Args:
+            client (str): The client ip address.
+            blocks (list of tuple): The blocks of the client.
+        """
+        for name in self.file_blocks.keys():
+            clients = self.file_blocks[name]
+            clients.pop(client, None)
+            if not clients:
+                del self.file_blocks[name]
+
+        for name, number, block_type in blocks:
+            clients = self.file_blocks.setdefault(name, {})
+            clients.setdefault(client, []).append(
+                (block_type, int(number), client))
+
+    def repopulate_in_chunks(self, treeview, records):
+        """
+        Replace the rows of the model of the given tree view, in chunks.
+
+        The first chunk is added at once, and the rest are added when
+        the main loop is idle, so the gui is drawn and responds between
+        the chunks. A new fill of the tree view cancels the previous one.
+
+        Args:
+            treeview (gtk.TreeView): The tree view.
+            records (list of tuple): The new rows.
+        """
+        source = self.fill_sources.pop(treeview, None)
+        if source is not None:
+            gobject.source_remove(source)
+
+        repopulate(treeview, records[:FILL_CHUNK_SIZE])
+
+        if len(records) > FILL_CHUNK_SIZE:
+            chunks = self.fill_chunks(treeview, records)
+            self.fill_sources[treeview] = gobject.idle_add(chunks.next)
+
+    def fill_chunks(self, treeview, records):
+        """
+        Add the rows after the first chunk, a chunk on every call.
+
+        Args:
+            treeview (gtk.TreeView): The tree view.
+            records (list of tuple): The rows.
+
+        Yields:
+            bool: True while rows are left, so the idle callback is kept.
+        """
+        store = treeview.get_model()
+        for start in xrange(FILL_CHUNK_SIZE, len(records), FILL_CHUNK_SIZE):
+            for record in records[start:start + FILL_CHUNK_SIZE]:
+                store.append(record)
+            yield True
+
+        del self.fill_sources[treeview]
+        yield False
+
+    def disk_state(self, message):
+        """
+        Schedule a display update of the disk state of a client,
+        so a burst of disk states is displayed at once.
+
+        Args:
+            message (dict): The disk_state message.
+        """
+        if not self.pending_disk_states:
+            gobject.idle_add(self.update_disk_states)
+
+        disk_state = (message['total'], message['free'])
+        self.pending_disk_states[message['client']] = disk_state
+
+    def error(self, message):
+        """
+        Display an error message.
+
+        Args:
+            message (dict): The error message.
+        """
+        self.display_error(message['message'])
+
+    @handle_except('gui')
+    def update_disk_states(self):
+        """Display the disk states received since the last update."""
+        pending = self.pending_disk_states
+        self.pending_disk_states = {}
+
+        clients_store = self.clients_store
+        for client_ip, disk_state in pending.iteritems():
+            client_iter = self.client_iters.get(client_ip)
+
+            # skip clients which are gone, or whose disk didn't change
+            if client_iter is None:
+                continue
+            if self.disk_states.get(client_ip) == disk_state:
+                continue
+
+            total, free = disk_state
+            clients_store.set(client_iter, 1, total, 2, total - free)
+            self.disk_states[client_ip] = disk_state
+
     def display_error(self, message):
         """
         Display an error message.
@@ -383,16 +656,45 @@ class Gui(object):
         Args:
             enable (bool): True to enable, False to disable.
         """
-        for button in self.builder.get_object('file_system_toolbar'):
-            button.set_sensitive(enable)
-        for button in self.builder.get_object('waiting_files_toolbar'):
-            button.set_sensitive(enable)
-        for button in self.builder.get_object('clients_toolbar'):
-            button.set_sensitive(enable)
+        # every change of the buttons redraws them, so they are changed
+        # only if their state is different
+        if self.buttons_enabled == enable:
+            return
+        self.buttons_enabled = enable
+
+        for toolbar in self.toolbars:
+            for button in toolbar:
+                button.set_sensitive(enable)
+
+    def delay(self, callback, widget, data=None):
+        """
+        Call a signal callback after a short delay.
+
+        If the signal fires again before the delay is over, the previous
+        call is canceled, so a burst of signals, like moving the cursor
+        over many rows, calls the callback once.
+
+        Args:
+            callback (function): The signal callback.
+            widget (gtk.Widget): The widget that fired the event
+            data (object, optional): Additional data.
+        """
+        source = self.delayed_sources.pop(callback, None)
+        if source is not None:
+            gobject.source_remove(source)
+
+        def call():
+            """Call the callback once, when the delay is over."""
+            del self.delayed_sources[callback]
+            callback(widget, data)
+            return False
+
+        self.delayed_sources[callback] = gobject.timeout_add(
+            CURSOR_DELAY, call)
 
     def hide_upload_window(self):
         """Hide the upload window."""
-        self.builder.get_object('upload_window').hide()
+        self.upload_window.hide()
 
     @handle_except('gui')
     def file_system_download_clicked(self, widget, data=None):
@@ -406,9 +708,7 @@ class Gui(object):
             widget (gtk.Widget): The widget that fired the event
             data (object, optional): Additional data.
         """
-        file_system_tree_view = self.builder.get_object(
-            'file_system_tree_view')
-        virtual_file_name = get_selection(file_system_tree_view, 0)
+        virtual_file_name = get_selection(self.file_system_tree_view, 0)
 
         if virtual_file_name is not None:
             dialog = gtk.FileChooserDialog(
@@ -437,9 +737,8 @@ class Gui(object):
             widget (gtk.Widget): The widget that fired the event
             data (object, optional): Additional data.
         """
-        upload_window = self.builder.get_object('upload_window')
-        upload_window.resize(600, 500)
-        upload_window.show_all()
+        self.upload_window.resize(600, 500)
+        self.upload_window.show_all()
 
     @handle_except('gui')
     def upload_window_delete_event(self, widget, data=None):
@@ -466,31 +765,24 @@ class Gui(object):
             widget (gtk.Widget): The widget that fired the event
             data (object, optional): Additional data.
         """
-        file_path = unicode(self.builder.get_object(
-            'upload_file_chooser').get_file().get_path())
+        file_path = unicode(self.upload_file_chooser.get_file().get_path())
 
-        block_size = os.path.getsize(file_path) / int(self.builder.get_object(
-            'block_number_scale').get_value())
+        # the block size is calculated by the logic thread
+        block_number = int(self.block_number_scale.get_value())
 
-        validation = int(self.builder.get_object(
-            'validation_scale').get_value())
+        validation = int(self.validation_scale.get_value())
 
-        duplication = int(self.builder.get_object(
-            'duplication_scale').get_value())
+        duplication = int(self.duplication_scale.get_value())
 
-        can_distribute = True
-        file_system_store = self.builder.get_object('file_system_store')
+        # the displayed files are indexed by their names
         base_name = os.path.basename(file_path)
-        for i in file_system_store:
-            if i[0] == base_name:
-                can_distribute = False
-                self.display_error(
-                    'The file already exists in the storage.')
-
-        if can_distribute:
+        if base_name in self.file_iters:
+            self.display_error('The file already exists in the storage.')
+        else:
             distribute = protocol.thread.distribute(
                 file_path=file_path,
-                block_size=block_size,
+                block_size=None,
+                block_number=block_number,
                 validation=validation,
                 duplication=duplication)
 
@@ -517,9 +809,7 @@ class Gui(object):
             widget (gtk.Widget): The widget that fired the event
             data (object, optional): Additional data.
         """
-        file_system_tree_view = self.builder.get_object(
-            'file_system_tree_view')
-        name = get_selection(file_system_tree_view, 0)
+        name = get_selection(self.file_system_tree_view, 0)
         if name is not None:
             self.logic_queue.put(protocol.thread.reconstruct(name=name))
 
@@ -532,9 +822,7 @@ class Gui(object):
             widget (gtk.Widget): The widget that fired the event
             data (object, optional): Additional data.
         """
-        file_system_tree_view = self.builder.get_object(
-            'file_system_tree_view')
-        file_name = get_selection(file_system_tree_view, 0)
+        file_name = get_selection(self.file_system_tree_view, 0)
         if file_name is not None:
             message = protocol.thread.delete(file_name)
             self.logic_queue.put(message)
@@ -548,8 +836,7 @@ class Gui(object):
             widget (gtk.Widget): The widget that fired the event
             data (object, optional): Additional data.
         """
-        waiting_files_view = self.builder.get_object('waiting_files_tree_view')
-        selection = get_selection(waiting_files_view, 1)
+        selection = get_selection(self.waiting_files_tree_view, 1)
         if selection is not None:
             message = protocol.thread.kill_thread(name=selection)
             self.logic_queue.put(message)
@@ -563,20 +850,14 @@ class Gui(object):
             widget (gtk.Widget): The widget that fired the event
             data (object, optional): Additional data.
         """
-        file_status_files_tree_view = self.builder.get_object(
-            'file_status_files_tree_view')
-        selection = get_selection(file_status_files_tree_view, 0)
-        file_status_blocks_tree_view = self.builder.get_object(
-            'file_status_blocks_tree_view')
-        store = file_status_blocks_tree_view.get_model()
-        store.clear()
-
-        for client in self.block_dict:
-            for block in self.block_dict[client]:
-                if block['name'] == selection:
-                    store.append((block['block_type'],
-                                  int(block['number']),
-                                  client))
+        selection = get_selection(self.file_status_files_tree_view, 0)
+
+        records = []
+        file_blocks = self.file_blocks.get(selection, {})
+        for client_records in file_blocks.itervalues():
+            records.extend(client_records)
+
+        self.repopulate_in_chunks(self.file_status_blocks_tree_view, records)
 
     @handle_except('gui')
     def clients_callback(self, widget, data=None):
@@ -587,19 +868,15 @@ class Gui(object):
             widget (gtk.Widget): The widget that fired the event
             data (object, optional): Additional data.
         """
-        selection = get_selection(
-            self.builder.get_object('clients_clients_tree_view'), 0)
-        store = self.builder.get_object('clients_blocks_store')
-        store.clear()
+        selection = get_selection(self.clients_clients_tree_view, 0)
 
         # if client is connected and send storage_state message,
         # his ip will appear in the blocks_dict variable
-        if selection in self.block_dict:
-            for block in self.block_dict[selection]:
-                block_record = (block['block_type'],
-                                block['name'],
-                                int(block['number']))
-                store.append(block_record)
+        records = [(block_type, name, int(number))
+                   for name, number, block_type
+                   in self.block_dict.get(selection, [])]
+
+        self.repopulate_in_chunks(self.clients_blocks_tree_view, records)
 
     @handle_except('gui')
     def clients_refresh_clicked(self, widget, data=None):
@@ -622,9 +899,7 @@ class Gui(object):
             widget (gtk.Widget): The widget that fired the event
             data (object, optional): Additional data.
         """
-        clients_tree_view = self.builder.get_object(
-            'clients_clients_tree_view')
-        client = get_selection(clients_tree_view, 0)
+        client = get_selection(self.clients_clients_tree_view, 0)
         if client is not None:
             self.logic_queue.put(protocol.thread.kill(client=client))
 
@@ -643,56 +918,121 @@ class Gui(object):
         message = protocol.thread.exit()
         # send an exit message the the rest of the program
         self.logic_queue.put(message)
-        # send an exit message to the helper thread
-        self.gui_queue.put(message)
 
     @handle_except('gui')
     def main(self):
         """Start the main event loop."""
-        helper = GuiHelperThread(
-            queue=self.gui_queue,
-            callback=self.process_message)
-        helper.start()
         gtk.main()
 
 
-class GuiHelperThread(threading.Thread):
+class GuiQueue(object):
     """
-    This thread helps the gui process incoming messages.
+    The queue of the gui.
 
-    The gui can't process messages in his main loop, because
-    it will block the gui. This helper thread receive the messages,
-    and then add a one time callback to each message to process it.
+    The gui can't wait for messages in his main loop, because
+    it will block the gui. Instead, the messages are kept in a deque,
+    and every put writes a byte to a pipe which is watched by the main
+    loop, so the main loop wakes up only when messages arrive, and
+    processes all the waiting messages at once. Where pipes can't be
+    watched, every message is added to the main loop as a one time
+    callback. A snapshot message is skipped if a newer one of the same
+    type (and client) was put, since it would be replaced anyway.
 
     Attributes:
-        callback (function): The callback to be called.
-        logger (logging.Logger): The logger of the class.
-        queue (Queue.Queue): The queue to get messages from.
+        callback (function): The callback processing the messages.
     """
 
-    def __init__(self, queue, callback):
+    def __init__(self, callback=None):
         """
-        Initialize the helper thread.
+        Initialize the gui queue.
 
         Args:
-            callback (function): The callback to be called.
-            queue (Queue.Queue): The queue to get messages from.
+            callback (function, optional): The callback processing
+                the messages.
         """
-        current_class = self.__class__
-        thread_name = current_class.__name__
-        super(current_class, self).__init__(name=thread_name)
-        self.logger = logging.getLogger('gui')
-
-        self.queue = queue
         self.callback = callback
+        self.__messages = collections.deque()
 
-    @handle_except('gui')
-    def run(self):
-        """Execute the helper thread."""
-        running = True
-        while running:
-            message = self.queue.get()
-            if message['type'] == 'exit':
-                running = False
-            else:
-                gobject.idle_add(self.callback, message)
+        # the latest snapshot messages, by their type and client
+        self.__snapshots = {}
+
+        if fcntl is None:
+            self.__wake_read = self.__wake_write = None
+            return
+
+        # the pipe doesn't block, a full pipe already wakes the main loop
+        self.__wake_read, self.__wake_write = os.pipe()
+        for fd in (self.__wake_read, self.__wake_write):
+            flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+            fcntl.fcntl(fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+
+        gobject.io_add_watch(self.__wake_read, gobject.IO_IN, self.__drain)
+
+    def __drain(self, source, condition):
+        """
+        Process the waiting messages, when the main loop wakes up.
+
+        Args:
+            source (int): The read end of the pipe.
+            condition (int): The condition of the pipe.
+
+        Returns:
+            bool: True, to keep watching the pipe.
+        """
+        # the pipe is emptied before the messages, so a message that is
+        # put after the messages were processed wakes the main loop again
+        try:
+            while os.read(self.__wake_read, 4096):
+                pass
+        except OSError as e:
+            if e.errno != errno.EAGAIN:
+                raise
+
+        while self.__messages:
+            self.__process(self.__messages.popleft())
+
+        return True
+
+    def __process(self, message):
+        """
+        Process a message, unless it is a snapshot that was replaced.
+
+        Args:
+            message (dict): The message.
+
+        Returns:
+            bool: False, so the message is processed once
+                when it is added as a one time callback.
+        """
+        if message['type'] in SNAPSHOT_TYPES:
+            key = (message['type'], message.get('client'))
+            if self.__snapshots.get(key, message) is not message:
+                return False
+
+            # if a newer snapshot was put meanwhile, it is processed too
+            self.__snapshots.pop(key, None)
+
+        self.callback(message)
+        return False
+
+    def put(self, message):
+        """
+        Pass a message to the main loop of the gui.
+
+        Args:
+            message (dict): The message.
+        """
+        if message['type'] in SNAPSHOT_TYPES:
+            key = (message['type'], message.get('client'))
+            self.__snapshots[key] = message
+
+        if self.__wake_write is None:
+            gobject.idle_add(self.__process, message)
+            return
+
+        self.__messages.append(message)
+        try:
+            os.write(self.__wake_write, '\0')
+        except OSError as e:
+            if e.errno != errno.EAGAIN:
+                raise
@@ -9,7 +9,7 @@ import database
 from distribute import DistributeThread
 from restore import RestoreThread
 from reconstruct import ReconstructThread
-from utils import handle_except
+from utils import handle_except, MessageQueue
 
 
 class LogicThread(threading.Thread):
@@ -19,10 +19,10 @@ class LogicThread(threading.Thread):
     Attributes:
         clients (list): List of connected clients.
         db_name (str): The path to the db file.
-        gui_queue (Queue.Queue): The queue of the gui thread.
+        gui_queue (gui.GuiQueue): The queue of the gui thread.
         logger (logging.Logger): The logger of the thread.
-        logic_queue (Queue.Queue): The queue of the logic thread.
-        network_queue (Queue.Queue): The queue of the network thread.
+        logic_queue (utils.MessageQueue): The queue of the logic thread.
+        network_queue (utils.MessageQueue): The queue of the network thread.
         running (bool): The flag of the main loop of the thread.
         running_threads (dict): Dict of the current running thread of
             type 'restore' or 'deistribute'. Described in more details in
@@ -34,9 +34,10 @@ class LogicThread(threading.Thread):
         Initialize the logic thread.
 
         Args:
-            logic_queue (Queue.Queue): The queue of the logic thread.
-            gui_queue (Queue.Queue): The queue of the gui thread.
-            network_queue (Queue.Queue): The queue of the network thread.
+            logic_queue (utils.MessageQueue): The queue of the logic thread.
+            gui_queue (gui.GuiQueue): The queue of the gui thread.
+            network_queue (utils.MessageQueue): The queue of the network
+                thread.
         """
         current_class = self.__class__
         thread_name = current_class.__name__
@@ -79,7 +80,7 @@ class LogicThread(threading.Thread):
             duplication_level (int): The duplication level of the file.
             validation_level (int): The validation level of the file.
             key (str): The encryption key of the file.
-            queue (Queue.Queue): The queue of the thread.
+            queue (utils.MessageQueue): The queue of the thread.
         """
         self.running_threads[ident] = {
             'thread_type': thread_type,
@@ -101,15 +102,15 @@ class LogicThread(threading.Thread):
         The information is sent to the gui, and to the distribution protocol,
         if running.
         """
-        # copy the thread dict
-        thread_list = {}
-        for ident in self.running_threads:
-            thread_list[ident] = self.running_threads[ident].copy()
-
-        # remove information that shouln't be visible to other threads
-        for ident in thread_list:
-            del thread_list[ident]['queue']
-            del thread_list[ident]['key']
+        # build the rows displayed by the gui here, instead of in the main
+        # loop of the gui, without the information that shouln't be visible
+        # to other threads
+        thread_list = []
+        for thread in self.running_threads.itervalues():
+            record = (thread['thread_type'], thread['name'],
+                      thread['file_size'], thread['block_number'],
+                      thread['duplication'], thread['validation'])
+            thread_list.append(record)
 
         # create the message
         message = protocol.thread.thread_list(
@@ -180,9 +181,15 @@ class LogicThread(threading.Thread):
         callback = received['callback']
         self.logger.debug('distributing file %s' % file_path)
 
+        # the size of the file is read here and not in the gui,
+        # so a slow file system doesn't block the gui
+        file_size = os.stat(file_path).st_size
+        if block_size is None:
+            block_size = file_size / received['block_number']
+
         # generate encryption key
         key = os.urandom(16)
-        distribute_queue = Queue.Queue()
+        distribute_queue = MessageQueue()
 
         # create the thread
         distribute = DistributeThread(
@@ -198,10 +205,7 @@ class LogicThread(threading.Thread):
         distribute.start()
 
         # calculate the number of blocks
-        file_size = os.stat(file_path).st_size
-        block_number = file_size / block_size
-        if file_size % block_size != 0:
-            block_number += 1
+        block_number = (file_size + block_size - 1) // block_size
 
         file_name = os.path.basename(file_path)
 
@@ -234,7 +238,7 @@ class LogicThread(threading.Thread):
         block_number = query[2]
         validation_level = query[4]
         key = query[5]
-        restore_queue = Queue.Queue()
+        restore_queue = MessageQueue()
 
         # create the thread
         restore = RestoreThread(real_file=real_file,
@@ -291,7 +295,7 @@ class LogicThread(threading.Thread):
         if file_size % block_number != 0:
             block_size += 1
 
-        reconstruct_queue = Queue.Queue()
+        reconstruct_queue = MessageQueue()
         thread = ReconstructThread(
             virtual_file=name,
             block_size=block_size,
@@ -559,6 +563,7 @@ class LogicThread(threading.Thread):
         # the dict dispatch a message type to a handler
         command_dict = {
             'send': self.send_message,
+            'batch': self.send_message,
             'ask_thread_list': lambda x: self.update_thread_list(),
             'distribute': self.distribute,
             'restore': self.restore,
@@ -575,13 +580,18 @@ class LogicThread(threading.Thread):
             'kill': self.kill
         }
 
-        # wrap the body to the main loop in a fucntion,
+        # wrap the handling of a message in a fucntion,
         # to apply it the 'handle_except' decorator.
-        # this way, no matter what, the thread won't fail.
+        # this way, no matter what, the thread won't fail,
+        # and the rest of the waiting messages are handled.
         @handle_except('logic')
-        def do_loop():
-            """Execute one step of the main loop of the thread."""
-            received = self.logic_queue.get()
+        def dispatch(received):
+            """
+            Handle a message from the queue.
+
+            Args:
+                received (dict): Message from the queue.
+            """
             command = received['type']
 
             if command in command_dict:
@@ -590,6 +600,23 @@ class LogicThread(threading.Thread):
                 log = 'unknown message type: %s. message not processed'
                 self.logger.warning(log % command)
 
+        def do_loop():
+            """
+            Execute one step of the main loop of the thread.
+
+            The thread waits for the first message, and then handles
+            all the messages which are already waiting, without waiting
+            again for each of them.
+            """
+            dispatch(self.logic_queue.get())
+
+            while self.running:
+                try:
+                    received = self.logic_queue.get_nowait()
+                except Queue.Empty:
+                    return
+                dispatch(received)
+
         self.update_client_state()
         while self.running:
             do_loop()
@@ -1,7 +1,6 @@
 #!/usr/bin/env python
 """This module is executed by the user to start the program."""
 
-import Queue
 import logging
 import logging.config
 import optparse
@@ -14,7 +13,7 @@ import logic
 import network
 import gui
 
-from utils import handle_except
+from utils import handle_except, MessageQueue
 
 
 @handle_except('other')
@@ -38,9 +37,9 @@ def main():
     logger = logging.getLogger('other')
     logger.info('main thread started')
 
-    logic_queue = Queue.Queue()
-    gui_queue = Queue.Queue()
-    network_queue = Queue.Queue()
+    logic_queue = MessageQueue()
+    gui_queue = gui.GuiQueue()
+    network_queue = MessageQueue()
 
     network_receiver_thread = network.NetworkReceiverThread(
         network_queue=network_queue,
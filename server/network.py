@@ -24,9 +24,9 @@ class NetworkReceiverThread(threading.Thread):
 
     Attributes:
         logger (logging.Logger): The logger of the thread.
-        logic_queue (Queue.Queue): The queue of the logic thread.
+        logic_queue (utils.MessageQueue): The queue of the logic thread.
         messages (dict): Dict of messages that wasn't fully received.
-        network_queue (Queue.Queue): The queue of the thread.
+        network_queue (utils.MessageQueue): The queue of the thread.
         port (int): The connection port.
         server (socket.socket): The main socket of the server.
         sockets (dict): The sockets of the clients.
@@ -40,8 +40,8 @@ class NetworkReceiverThread(threading.Thread):
         Initialize the receiver thread.
 
         Args:
-            network_queue (Queue.Queue): The queue of the thread.
-            logic_queue (Queue.Queue): The queue of the logic thread.
+            network_queue (utils.MessageQueue): The queue of the thread.
+            logic_queue (utils.MessageQueue): The queue of the logic thread.
             port (int): The connection port.
         """
         current_class = self.__class__
@@ -174,8 +174,8 @@ class NetworkSenderThread(threading.Thread):
 
     Attributes:
         logger (logging.Logger): The logger of the thread.
-        logic_queue (Queue.Queue): The queue of the logic thread.
-        network_queue (Queue.Queue): The queue of the thread.
+        logic_queue (utils.MessageQueue): The queue of the logic thread.
+        network_queue (utils.MessageQueue): The queue of the thread.
         running (bool): The flag of the main loop.
         sockets (dict): Dict of the connections.
     """
@@ -188,8 +188,8 @@ class NetworkSenderThread(threading.Thread):
         Initialize the sender thread.
 
         Args:
-            logic_queue (Queue.Queue): The queue of the logic thread.
-            network_queue (Queue.Queue): The queue of the thread.
+            logic_queue (utils.MessageQueue): The queue of the logic thread.
+            network_queue (utils.MessageQueue): The queue of the thread.
             port (int): The connection port.
         """
         current_class = self.__class__
@@ -224,6 +224,25 @@ class NetworkSenderThread(threading.Thread):
             self.logic_queue.put(thread_message)
             del self.sockets[ip]
 
+    def send_message(self, message):
+        """
+        Send a message from the queue to its clients.
+
+        Args:
+            message (dict): Send message from the queue.
+        """
+        client = message['client']
+        net_message = message['message']
+
+        if client == '*':
+            for ip in self.sockets:
+                self.send(self.sockets[ip], net_message)
+        elif client in self.sockets:
+            self.send(self.sockets[client], net_message)
+        else:
+            self.logger.warning(
+                'there is no client %s, can\'t send message' % client)
+
     @handle_except('network')
     def run(self):
         """Execute the network sender thread."""
@@ -237,18 +256,12 @@ class NetworkSenderThread(threading.Thread):
 
             # send a message to the clients
             if message_type == 'send':
+                self.send_message(message)
 
-                client = message['client']
-                net_message = message['message']
-
-                if client == '*':
-                    for ip in self.sockets:
-                        self.send(self.sockets[ip], net_message)
-                elif client in self.sockets:
-                    self.send(self.sockets[client], net_message)
-                else:
-                    self.logger.warning(
-                        'there is no client %s, can\'t send message' % client)
+            # send several messages, which were queued together
+            elif message_type == 'batch':
+                for batch_message in message['messages']:
+                    self.send_message(batch_message)
 
             # add new socket to the list
             elif message_type == 'new_socket':
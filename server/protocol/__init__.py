@@ -9,14 +9,64 @@ Attributes:
     build (function): Message building function.
     parse (function): message parsing function.
 """
+from __future__ import absolute_import
 
-import msgpack
 import struct
+import threading
 import zlib
 
+from protocol import msgpack as umsgpack
+
+# the compiled msgpack package is used when it is installed,
+# the bundled pure python implementation is used otherwise
+try:
+    import msgpack as compiled_msgpack
+    compiled_msgpack.Unpacker(raw=False, strict_map_key=False)
+except (ImportError, TypeError):
+    compiled_msgpack = None
+
 DATA_BLOCK = 'data'
 METADATA_BLOCK = 'metadata'
 
+# the first byte of every built message tells if it is a raw message,
+# whose content is appended after its header. messages are not compressed
+# anymore, but messages compressed with a flag can still be parsed, and so
+# can messages built without a flag, like old metadata blocks (see parse)
+__PLAIN = '\x00'
+__COMPRESSED = '\x01'
+__RAW = '\x02'
+
+# the format of the sizes in the message frames
+__SIZE = struct.Struct('>L')
+
+if compiled_msgpack is None:
+    # the bundled implementation types the strings like the compiled
+    # package is configured below (use_bin_type=True, raw=False): str is
+    # packed as bin and unicode as str, and str is unpacked to unicode.
+    # its compatibility mode packs both as the old raw type, and unpacks
+    # raw as str, so it is turned off explicitly
+    umsgpack.compatibility = False
+
+    __dumps = umsgpack.dumps
+    __loads = umsgpack.loads
+
+else:
+    # packers keep their buffer between calls, but can't be shared
+    # between threads, so every thread creates its own packer
+    __local = threading.local()
+
+    def __dumps(obj):
+        try:
+            packer = __local.packer
+        except AttributeError:
+            packer = __local.packer = compiled_msgpack.Packer(
+                use_bin_type=True)
+        return packer.pack(obj)
+
+    def __loads(string):
+        return compiled_msgpack.unpackb(
+            string, raw=False, strict_map_key=False)
+
 
 def parse(message):
     """
@@ -28,7 +78,22 @@ def parse(message):
     Return:
         dict: The parsed message.
     """
-    return msgpack.loads(zlib.decompress(message))
+    flag = message[:1]
+    if flag == __RAW:
+        header_size = __SIZE.unpack_from(message, 1)[0]
+        parsed = __loads(message[5:5 + header_size])
+        parsed['content'] = message[5 + header_size:]
+        return parsed
+
+    if flag == __PLAIN:
+        return __loads(message[1:])
+    if flag == __COMPRESSED:
+        return __loads(zlib.decompress(message[1:]))
+
+    # messages built by older versions, like the metadata blocks that
+    # the clients already store, are compressed without a flag byte
+    # (a zlib stream never starts with one of the flags)
+    return __loads(zlib.decompress(message))
 
 
 def build(message):
@@ -41,7 +106,7 @@ def build(message):
     Return:
         str: The message.
     """
-    return zlib.compress(msgpack.dumps(message))
+    return __PLAIN + __dumps(message)
 
 
 def __message(message_type, **kwargs):
@@ -59,6 +124,45 @@ def __message(message_type, **kwargs):
     return wrap(build(kwargs))
 
 
+def __raw_message_header(message_type, size, **kwargs):
+    """
+    Return the beginning of a message whose content is sent separately.
+
+    The content of the message is not serialized. It is sent as is
+    right after the returned header, so it can be streamed from a file.
+
+    Args:
+        message_type (str): The message type.
+        size (int): The size of the content in bytes.
+        **kwargs: Keyword to create the message.
+
+    Return:
+        str: The header of the message as a string.
+    """
+    kwargs['type'] = message_type
+    header = __dumps(kwargs)
+    body_header = __RAW + __SIZE.pack(len(header)) + header
+    return __SIZE.pack(len(body_header) + size) + body_header
+
+
+def __raw_message(message_type, content, **kwargs):
+    """
+    Return a message whose content is appended as is after its header.
+
+    The content is not serialized or compressed, so it is copied only once.
+
+    Args:
+        message_type (str): The message type.
+        content (str): The content of the message.
+        **kwargs: Keyword to create the message.
+
+    Return:
+        str: The message as a string.
+    """
+    header = __raw_message_header(message_type, len(content), **kwargs)
+    return header + content
+
+
 def wrap(string):
     """
     Wrap a string in a message frame for sending it in a socket.
@@ -69,7 +173,7 @@ def wrap(string):
     Returns:
         str: The wraped string.
     """
-    return struct.pack('>L', len(string)) + string
+    return __SIZE.pack(len(string)) + string
 
 
 def get_size(string):
@@ -82,4 +186,4 @@ def get_size(string):
     Returns:
         int: the size of the message.
     """
-    return struct.unpack('>L', string[:4])[0]
+    return __SIZE.unpack_from(string)[0]
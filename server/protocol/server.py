@@ -1,5 +1,5 @@
 """This module contains functions to create the messages from the server."""
-from protocol import __message
+from protocol import __message, __raw_message
 
 
 def ask_block(name, block_type='*', number='*'):
@@ -33,11 +33,10 @@ def send_block(block_type, name, number, content):
     Returns:
         str: Send_block message.
     """
-    return __message('send_block',
-                     block_type=block_type,
-                     name=name,
-                     number=number,
-                     content=content)
+    return __raw_message('send_block', content,
+                         block_type=block_type,
+                         name=name,
+                         number=number)
 
 
 def delete_block(name='*', block_type='*', number='*'):
@@ -19,16 +19,35 @@ def send(message, client='*'):
             }
 
 
+def batch(messages):
+    """
+    Create batch message.
+
+    Args:
+        messages (list of dict): The send messages in the batch.
+
+    Returns:
+        dict: Batch message.
+    """
+    return {'type': 'batch',
+            'messages': messages
+            }
+
+
 def distribute(
-        file_path, block_size, duplication, validation, callback=lambda: None):
+        file_path, block_size, duplication, validation, callback=lambda: None,
+        block_number=None):
     """
     Create distribute message.
 
     Args:
         file_path (str): The name of the file.
-        block_size (int): The size of the blocks.
+        block_size (int): The size of the blocks, or None to split
+            the file to the given number of blocks.
         duplication (int): The duplication level.
         validation (int): The validation level.
+        block_number (int, optional): The number of blocks to split
+            the file to, if the block size is None.
 
     Returns:
         dict: Distribute message.
@@ -36,6 +55,7 @@ def distribute(
     return {'type': 'distribute',
             'file_path': file_path,
             'block_size': block_size,
+            'block_number': block_number,
             'duplication': duplication,
             'validation': validation,
             'callback': callback
@@ -150,7 +170,8 @@ def thread_list(threads):
     Create thread_list message.
 
     Args:
-        threads (list): The list of threads and their details.
+        threads (list of tuple): The details of the threads, in the order
+            of the columns of the gui.
     Returns:
         dict: Thread_list message.
     """
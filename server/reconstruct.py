@@ -19,8 +19,8 @@ class ReconstructThread(threading.Thread):
         clients (list of str): List of the clients.
         key (str): The encryption key.
         logger (logging.Logger): The logger of the thread.
-        logic_queue (Queue.Queue): The queue of the logic thread.
-        reconstruct_queue (Queue.Queue): The queue of the thread.
+        logic_queue (utils.MessageQueue): The queue of the logic thread.
+        reconstruct_queue (utils.MessageQueue): The queue of the thread.
         callback (func, optional): A callback to be called
                 after the thread finished
         temp (str): Temporary directory to store the restored files.
@@ -47,8 +47,8 @@ class ReconstructThread(threading.Thread):
             validation_level (int): The number of data block that each
             clients (list of str): List of the clients.
             key (str): The encryption key.
-            reconstruct_queue (Queue.Queue): The queue of the thread.
-            logic_queue (Queue.Queue): The queue of the logic thread.
+            reconstruct_queue (utils.MessageQueue): The queue of the thread.
+            logic_queue (utils.MessageQueue): The queue of the logic thread.
             callback (func, optional): A callback to be called
                 after the thread finished
             temp (str): Temporary directory to store the restored files.
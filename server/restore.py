@@ -11,6 +11,36 @@ import encrypt
 import protocol
 
 
+def get_block_hash(metadata, number):
+    """
+    Return the hash of a data block from a metadata block.
+
+    The hashes are packed one after the other, from the first block of
+    the metadata block. Metadata blocks created by older versions map
+    every block number to its hash.
+
+    Args:
+        metadata (dict): The parsed metadata block.
+        number (int): The number of the data block.
+
+    Returns:
+        str: The hash of the block, or None if it's not in the metadata.
+    """
+    hashes = metadata.get('hashes')
+    if isinstance(hashes, dict):
+        return hashes.get(number)
+
+    first = metadata.get('first')
+    if hashes is None or first is None or number < first:
+        return None
+
+    start = (number - first) * encrypt.hash_size
+    block_hash = hashes[start:start + encrypt.hash_size]
+    if len(block_hash) != encrypt.hash_size:
+        return None
+    return block_hash
+
+
 class RestoreThread(threading.Thread):
     """
     The restore thread class.
@@ -20,11 +50,12 @@ class RestoreThread(threading.Thread):
         callback (func, optional): A callback to be called
                 after the thread finished
         clients (list of str): List of the clients.
+        digested_key (str): The encryption key, digested to the key size.
         key (str): The encryption key.
         logger (logging.Logger): The logger of the thread.
-        logic_queue (Queue.Queue): The queue of the logic thread.
+        logic_queue (utils.MessageQueue): The queue of the logic thread.
         real_file (str): The path that the file will be restored into.
-        restore_queue (Queue.Queue): The queue of the thread.
+        restore_queue (utils.MessageQueue): The queue of the thread.
         temp (str): The path of the temporary directory.
         validation_level (int): The number of data block that each
             metadata block is covering.
@@ -54,8 +85,8 @@ class RestoreThread(threading.Thread):
                 metadata block is covering.
             clients (list of str): List of the clients.
             key (str): The encryption key.
-            restore_queue (Queue.Queue): The queue of the thread.
-            logic_queue (Queue.Queue): The queue of the logic thread.
+            restore_queue (utils.MessageQueue): The queue of the thread.
+            logic_queue (utils.MessageQueue): The queue of the logic thread.
             callback (func, optional): A callback to be called
                 after the thread finished
             temp (str, optional): The path of the temporary directory.
@@ -73,12 +104,12 @@ class RestoreThread(threading.Thread):
         self.validation_level = validation_level
 
         # calculate the number of metadata blocks from the validation level
-        self.validation_number = block_number / validation_level
-        if block_number % validation_level != 0:
-            self.validation_number += 1
+        self.validation_number = ((block_number + validation_level - 1) //
+                                  validation_level)
 
         self.clients = dict((client, False) for client in clients)
         self.key = key
+        self.digested_key = encrypt.digest_key(key)
         self.restore_queue = restore_queue
         self.logic_queue = logic_queue
         self.callback = callback
@@ -118,7 +149,7 @@ class RestoreThread(threading.Thread):
             if not os.path.exists(client_dir):
                 os.mkdir(client_dir)
 
-        decrypted = encrypt.decrypt(self.key, message['content'])
+        decrypted = encrypt.aes_ctr(self.digested_key, message['content'])
         # write the content to file
         with open(file_path, 'wb') as f:
             f.write(decrypted)
@@ -231,9 +262,8 @@ class RestoreThread(threading.Thread):
         mapping = {}
         for path in self.get_blocks_names(block_type=protocol.METADATA_BLOCK):
             basename = os.path.basename(path)
-            file_info = parse_file_name(basename)
+            _, number, _ = parse_file_name(basename)
 
-            number = file_info['number']
             if number.isdigit():
                 number = int(number)
                 mapping[number] = {'path': path, 'blocks': {}}
@@ -287,13 +317,13 @@ class RestoreThread(threading.Thread):
                 # if the metadata can be used, validate the blocks against it
                 for block_number in blocks_dict:
 
-                    if 'hashes' in metadata:
-                        hashes = metadata['hashes']
-                        if block_number in hashes:
-                            block_hash = hashes[block_number]
-
+                    block_hash = get_block_hash(metadata, block_number)
                     block_list = blocks_dict[block_number]
 
+                    # blocks without a hash can't be validated
+                    if block_hash is None:
+                        block_list = []
+
                     if block_list == []:
                         missing_data[metadata_number].append(block_number)
 
@@ -302,8 +332,7 @@ class RestoreThread(threading.Thread):
                         content = f.read()
                         f.close()
 
-                        validated_hash = encrypt.hash_string(content)
-                        if validated_hash.lower() == block_hash.lower():
+                        if encrypt.check_hash(content, block_hash):
                             valid_blocks[block_number] = path
                             break
 
@@ -330,7 +359,7 @@ class RestoreThread(threading.Thread):
 
                         path, _ = max(set(content), key=content.count)
                         basename = os.path.basename(path)
-                        number = parse_file_name(basename)['number']
+                        _, number, _ = parse_file_name(basename)
                         number = int(number)
                         valid_blocks[number] = path
                     else:
@@ -380,10 +409,11 @@ class RestoreThread(threading.Thread):
                             restored = encrypt.xor_strings(restored, content)
 
                     # if the hash of the block is valid, write it to file
-                    restored_hash = encrypt.hash_string(restored)
-                    metadata_hash = metadata['hashes'][missing_block_number]
+                    metadata_hash = get_block_hash(metadata,
+                                                   missing_block_number)
 
-                    if restored_hash.lower() == metadata_hash.lower():
+                    if (metadata_hash is not None and
+                            encrypt.check_hash(restored, metadata_hash)):
                         file_name = build_file_name(
                             block_type=protocol.DATA_BLOCK,
                             name=self.virtual_file,
@@ -0,0 +1 @@
+"""The tests of the server, run from the server directory by unittest."""
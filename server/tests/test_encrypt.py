@@ -0,0 +1,42 @@
+"""The tests of the encrypt module."""
+import hashlib
+import unittest
+
+import encrypt
+import protocol
+import restore
+from tests.test_protocol import LEGACY_METADATA
+
+
+class CheckHashTest(unittest.TestCase):
+    """Test checking blocks against their hashes."""
+
+    def test_raw_hash(self):
+        """Test the raw hashes of the current metadata blocks."""
+        block_hash = encrypt.hash_string('block')
+
+        self.assertTrue(encrypt.check_hash('block', block_hash))
+        self.assertFalse(encrypt.check_hash('other', block_hash))
+
+    def test_hex_hash(self):
+        """Test the hex encoded hashes of old metadata blocks."""
+        block_hash = hashlib.sha256('block').hexdigest()
+
+        self.assertTrue(encrypt.check_hash('block', block_hash))
+        self.assertTrue(encrypt.check_hash('block', block_hash.upper()))
+        self.assertFalse(encrypt.check_hash('other', block_hash))
+
+    def test_legacy_metadata(self):
+        """Test the blocks of an old metadata block against its hashes."""
+        metadata = protocol.parse(LEGACY_METADATA)
+        blocks = {1: 'first block', 2: 'second'}
+
+        for number, block in blocks.iteritems():
+            block_hash = restore.get_block_hash(metadata, number)
+            self.assertTrue(encrypt.check_hash(block, block_hash))
+        self.assertFalse(encrypt.check_hash(
+            'second', restore.get_block_hash(metadata, 1)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+"""The tests of the protocol package."""
+import binascii
+import unittest
+
+import protocol
+from protocol import msgpack as umsgpack
+
+# a metadata block of two blocks, 'first block' and 'second', as it was
+# built by the first version of the server, before the messages had
+# a flag byte. the clients still store metadata blocks like this one
+LEGACY_METADATA = binascii.unhexlify(
+    '789c15cd310ec2300c004001120b2c0c2c8847d8491c3b5b073e623b892a8154'
+    '892ecc7d5b1e062cb7de368eb3ae735bb7dd9882762e505c413a4a5777a29c43'
+    '32080d953c4b34834ec418d9b0756e0041ba276246f2fd9830c7ccaa6e3f9302'
+    'b24b55512b9425b85b2c2039b24067c454ab824283ff9392b3a771f82cef71ba'
+    '9e2ff7dbc35e8b3fbf32fe2e8d')
+
+
+class ParseTest(unittest.TestCase):
+    """Test the parsing of the built messages."""
+
+    def test_plain_message(self):
+        """Test that a built message is parsed back."""
+        message = {'type': 'test', 'number': 3, 'content': 'a\x00b'}
+        self.assertEqual(protocol.parse(protocol.build(message)), message)
+
+    def test_legacy_metadata(self):
+        """Test that an old metadata block, without a flag, is parsed."""
+        metadata = protocol.parse(LEGACY_METADATA)
+
+        self.assertEqual(metadata['xor'], '\x15\x0c\x11\x1c\x1aDblock')
+        self.assertEqual(sorted(metadata['hashes']), [1, 2])
+        self.assertEqual(
+            metadata['hashes'][1],
+            '2af7909ca08f18facc556624b02e1a5c683bb0f557137b1ef7e0028fc457715c')
+
+
+class StringTypesTest(unittest.TestCase):
+    """
+    Test that strings are typed the same by the bundled msgpack
+    and by the compiled package, so mixed installs agree.
+    """
+
+    # bin for str, and str for unicode
+    STRINGS = ['ab', u'ab']
+    PACKED = '\x92\xc4\x02ab\xa2ab'
+
+    def test_build(self):
+        """Test the types of the strings in a built message."""
+        built = protocol.build(self.STRINGS)
+        self.assertEqual(built[1:], self.PACKED)
+
+        parsed = protocol.parse(built)
+        self.assertEqual(parsed, self.STRINGS)
+        self.assertEqual(map(type, parsed), [str, unicode])
+
+    def test_bundled(self):
+        """Test the bundled implementation on its own."""
+        self.assertEqual(umsgpack.dumps(self.STRINGS), self.PACKED)
+        self.assertEqual(
+            map(type, umsgpack.loads(self.PACKED)), [str, unicode])
+
+    @unittest.skipIf(protocol.compiled_msgpack is None,
+                     'the compiled msgpack package is not installed')
+    def test_compiled(self):
+        """Test the compiled package against the bundled implementation."""
+        compiled = protocol.compiled_msgpack
+        packed = compiled.packb(self.STRINGS, use_bin_type=True)
+        self.assertEqual(packed, self.PACKED)
+
+        unpacked = compiled.unpackb(self.PACKED, raw=False)
+        self.assertEqual(map(type, unpacked), [str, unicode])
+
+
+if __name__ == '__main__':
+    unittest.main()
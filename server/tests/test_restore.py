@@ -0,0 +1,34 @@
+"""The tests of the restore module."""
+import unittest
+
+import encrypt
+import protocol
+import restore
+from tests.test_protocol import LEGACY_METADATA
+
+
+class GetBlockHashTest(unittest.TestCase):
+    """Test finding the hashes of the blocks in metadata blocks."""
+
+    def test_packed_hashes(self):
+        """Test the hashes packed one after the other."""
+        hashes = [encrypt.hash_string(block) for block in ('a', 'b', 'c')]
+        metadata = {'first': 4, 'hashes': ''.join(hashes), 'xor': ''}
+
+        self.assertEqual(restore.get_block_hash(metadata, 4), hashes[0])
+        self.assertEqual(restore.get_block_hash(metadata, 6), hashes[2])
+        self.assertIsNone(restore.get_block_hash(metadata, 3))
+        self.assertIsNone(restore.get_block_hash(metadata, 7))
+
+    def test_legacy_hashes(self):
+        """Test the hashes of an old metadata block, by block number."""
+        metadata = protocol.parse(LEGACY_METADATA)
+
+        self.assertEqual(
+            restore.get_block_hash(metadata, 2),
+            '16367aacb67a4a017c8da8ab95682ccb390863780f7114dda0a0e0c55644c7c4')
+        self.assertIsNone(restore.get_block_hash(metadata, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,11 @@
 """This module contains functions that don't fit to any other module."""
 import os
 import logging
-from glob import glob as old_glob
+import functools
+import collections
+import threading
+import time
+import Queue
 
 
 def handle_except(logger_name):
@@ -14,10 +18,11 @@ def handle_except(logger_name):
         logger_name (str): The logger name.
 
     """
+    logger = logging.getLogger(logger_name)
+
     def decorator(function):
+        @functools.wraps(function)
         def inner(*args, **kwargs):
-
-            logger = logging.getLogger(logger_name)
             try:
                 return function(*args, **kwargs)
             except Exception:
@@ -38,11 +43,7 @@ def build_file_name(name='*', number='*', block_type='*'):
     Returns:
         str: the file name.
     """
-    return '%(name)s_%(number)s.%(block_type)s' % {
-        'name': name,
-        'number': number,
-        'block_type': block_type
-    }
+    return '%s_%s.%s' % (name, number, block_type)
 
 
 def parse_file_name(file_name):
@@ -53,24 +54,67 @@ def parse_file_name(file_name):
         file_name (str): The file name.
 
     Returns:
-        dict: The parsed file name.
+        tuple: The name, the number and the type of the block.
+    """
+    dot = file_name.rindex('.')
+    underscore = file_name.rindex('_', 0, dot)
+    return (file_name[:underscore],
+            file_name[underscore + 1:dot],
+            file_name[dot + 1:])
+
+
+def __pattern_matcher(pattern):
+    """
+    Return a function checking if a file name matches a pattern.
+
+    The pattern is split by the wildcards once, so matching a name is
+    done with string comparisons instead of a regular expression.
+
+    Args:
+        pattern (str): The pattern. Only '*' is treated as a wildcard.
+
+    Returns:
+        function: Function receiving a file name and returning True
+            if it matches the pattern.
     """
-    name, rest = file_name.rsplit('_', 1)
-    number, block_type = rest.rsplit('.', 1)
-    return {
-        'name': name,
-        'number': number,
-        'block_type': block_type
-    }
+    pattern = os.path.normcase(pattern)
+    parts = pattern.split('*')
+
+    if len(parts) == 1:
+        return lambda name: os.path.normcase(name) == pattern
+
+    first, middle, last = parts[0], parts[1:-1], parts[-1]
+    min_length = len(first) + len(last)
+
+    def match(name):
+        name = os.path.normcase(name)
+        if len(name) < min_length:
+            return False
+        if not name.startswith(first) or not name.endswith(last):
+            return False
+
+        # the middle parts must appear in order between the edges
+        index = len(first)
+        end = len(name) - len(last)
+        for part in middle:
+            index = name.find(part, index, end)
+            if index == -1:
+                return False
+            index += len(part)
+        return True
+
+    return match
 
 
 def glob(*path_parts):
     """
     Return list of files by pattern.
 
-    This function wraps the standard module glob and adds some features.
+    This function replaces the standard module glob.
     It receives parts of a path and concatenate
     it to  platform independent path.
+    Only '*' is treated as a wildcard, and like the standard glob,
+    it doesn't match names starting with a dot.
 
     It also add built in unicode support.
 
@@ -81,4 +125,127 @@ def glob(*path_parts):
         list of matching paths.
     """
     path = unicode(os.path.join(*path_parts))
-    return old_glob(path)
+    directory, pattern = os.path.split(path)
+
+    if '*' in directory:
+        directories = glob(directory)
+    else:
+        directories = [directory]
+
+    match = __pattern_matcher(pattern)
+    hidden = pattern.startswith('.')
+    result = []
+
+    for directory in directories:
+        try:
+            names = os.listdir(directory or os.curdir)
+        except OSError:
+            continue
+
+        for name in names:
+            if name.startswith('.') and not hidden:
+                continue
+            if match(name):
+                result.append(os.path.join(directory, name))
+
+    return result
+
+
+class MessageQueue(object):
+    """
+    A queue of messages between threads, with the interface of Queue.Queue.
+
+    The messages are kept in a deque, whose append and popleft are atomic,
+    so putting a message only appends it and sets an event, and getting
+    a waiting message only pops it, without the lock and the condition
+    of Queue.Queue. The event is used only when the queue is empty.
+    Every queue is read by a single thread.
+    """
+
+    def __init__(self):
+        """Initialize the queue."""
+        self.__messages = collections.deque()
+        self.__event = threading.Event()
+
+    def put(self, message):
+        """
+        Put a message in the queue.
+
+        Args:
+            message (object): The message.
+        """
+        self.__messages.append(message)
+        self.__event.set()
+
+    put_nowait = put
+
+    def get(self, block=True, timeout=None):
+        """
+        Remove and return the first message in the queue.
+
+        Args:
+            block (bool, optional): Wait for a message if the queue is empty.
+            timeout (float, optional): The maximal time to wait in seconds,
+                or None to wait until a message is put.
+
+        Returns:
+            object: The message.
+
+        Raises:
+            Queue.Empty: If no message was put in time.
+        """
+        if timeout is not None:
+            deadline = time.time() + timeout
+
+        while True:
+            try:
+                return self.__messages.popleft()
+            except IndexError:
+                pass
+
+            if not block:
+                raise Queue.Empty
+
+            # the event is cleared before the deque is checked again,
+            # so a message that is put after the check sets it
+            self.__event.clear()
+            if self.__messages:
+                continue
+
+            if timeout is None:
+                self.__event.wait()
+            else:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise Queue.Empty
+                self.__event.wait(remaining)
+
+    def get_nowait(self):
+        """
+        Remove and return the first message, without waiting.
+
+        Returns:
+            object: The message.
+
+        Raises:
+            Queue.Empty: If the queue is empty.
+        """
+        return self.get(block=False)
+
+    def empty(self):
+        """
+        Check if the queue is empty.
+
+        Returns:
+            bool: True if no message is waiting.
+        """
+        return not self.__messages
+
+    def qsize(self):
+        """
+        Return the number of the waiting messages.
+
+        Returns:
+            int: The number of the messages.
+        """
+        return len(self.__messages)